@@ -19,41 +19,6 @@ st.config.set_option('server.maxUploadSize', 5)
 st.config.set_option('deprecation.showPyplotGlobalUse', False)
 
 
-def prefetch_resources():
-    """Background thread to prefetch common resources without causing threading issues"""
-    try:
-        # Import here to avoid circular imports
-        from database.scenario_dao import ScenarioDAO
-        from database import db_service as db
-        import time
-
-        # Add a small delay to ensure the main thread has initialized
-        time.sleep(0.5)
-
-        try:
-            # Prefetch all scenarios - this will now use thread-local connections
-            scenarios = ScenarioDAO.get_all_scenarios()
-            print(f"Prefetched {len(scenarios)} scenarios")
-
-            # Prefetch each individual scenario - using thread-local connections
-            for scenario in scenarios:
-                ScenarioDAO.get_scenario_by_id(scenario['id'])
-
-            print("Successfully prefetched all scenario details")
-        except Exception as e:
-            print(f"Error prefetching scenarios: {e}")
-
-        # Clean up ScenarioDAO thread resources when done
-        try:
-            ScenarioDAO.cleanup_thread()
-        except Exception as e:
-            print(f"Error cleaning up ScenarioDAO thread: {e}")
-
-        print("Prefetch complete: scenarios loaded in background")
-    except Exception as e:
-        print(f"Prefetch error: {e}")
-
-
 def optimize_performance():
     """Apply various performance optimizations"""
     # Increase SQLite cache size
@@ -64,13 +29,6 @@ def optimize_performance():
     import gc
     gc.collect()
 
-    # Start prefetch thread - with proper thread handling
-    import threading
-    prefetch_thread = threading.Thread(target=prefetch_resources, daemon=True)
-    prefetch_thread.start()
-
-    print(f"Started background prefetch thread (ID: {prefetch_thread.ident})")
-
 
 # Session persistence fixes
 def fix_session_persistence():
@@ -161,8 +119,15 @@ from utils.webrtc_emotion_detection import (
     is_child_distressed
 )
 
+@st.cache_resource(show_spinner=False)
+def clear_stale_cache_once():
+    """Clear st.cache_data once per server process rather than on every rerun"""
+    st.cache_data.clear()
+    return True
+
+
 # Clear cache on startup to prevent stale data
-st.cache_data.clear()
+clear_stale_cache_once()
 
 st.markdown("""
 <style>
@@ -11,15 +11,19 @@ parent_dir = os.path.dirname(current_dir)
 DB_PATH = os.path.join(parent_dir, "emobuddy.db")
 
 
-def get_db_connection():
-    """Create a connection to the SQLite database with proper settings"""
+def get_db_connection(check_same_thread=True):
+    """
+    Create a connection to the SQLite database with proper settings.
+    Pass check_same_thread=False for pooled connections that are handed between threads
+    (each is still used by one thread at a time).
+    """
     # Ensure database directory exists
     db_dir = os.path.dirname(DB_PATH)
     if db_dir and not os.path.exists(db_dir):
         os.makedirs(db_dir)
 
     # Create connection with proper settings
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(DB_PATH, check_same_thread=check_same_thread)
     conn.row_factory = sqlite3.Row  # Returns rows as dictionaries
 
     # Enable foreign key support
@@ -2,59 +2,56 @@ import sqlite3
 import uuid
 import json
 import threading
+import queue
 from datetime import datetime
 from database.db_schema import get_db_connection
 
 
-# Create a thread-local connection pool
+# Process-wide connection pool shared by all threads
 class ConnectionPool:
     _instance = None
-    _pool = {}  # Dictionary to store connections per thread
+    _instance_lock = threading.Lock()
     _max_connections = 5
-    _local = threading.local()
+
+    def __init__(self):
+        # Idle connections; LIFO keeps the most recently used (warm) connection in play
+        self._idle = queue.LifoQueue(maxsize=self._max_connections)
 
     @classmethod
     def get_instance(cls):
         if cls._instance is None:
-            cls._instance = ConnectionPool()
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = ConnectionPool()
         return cls._instance
 
     def get_connection(self):
-        """Get a connection specific to the current thread"""
-        thread_id = threading.get_ident()
-
-        # Initialize thread-local pool if needed
-        if thread_id not in self._pool:
-            self._pool[thread_id] = []
-
-        # Get a connection from the thread's pool or create a new one
-        if self._pool[thread_id]:
-            return self._pool[thread_id].pop()
-        else:
-            return get_db_connection()
+        """Borrow an idle connection, or open a new one if none is free"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            # Streamlit runs each script execution on a new thread, so pooled
+            # connections must be usable from whichever thread borrows them
+            return get_db_connection(check_same_thread=False)
 
     def return_connection(self, conn):
-        """Return a connection to the thread's pool"""
-        thread_id = threading.get_ident()
-
-        # Initialize thread-local pool if needed
-        if thread_id not in self._pool:
-            self._pool[thread_id] = []
-
-        if len(self._pool[thread_id]) < self._max_connections:
-            self._pool[thread_id].append(conn)
-        else:
+        """Return a connection to the pool, closing it if the pool is full"""
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
             conn.close()
 
     def clear_connections(self):
-        """Close all connections in all thread pools"""
-        for thread_id in list(self._pool.keys()):
-            for conn in self._pool[thread_id]:
-                try:
-                    conn.close()
-                except Exception:
-                    pass
-            self._pool[thread_id] = []
+        """Close all idle connections in the pool"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                conn.close()
+            except Exception:
+                pass
 
 
 # Updated transaction class that uses the thread-safe connection pool
@@ -211,6 +208,9 @@ def record_response(session_id, scenario_id, phase_id, option_id, emotion=None):
                 (session_id, scenario_id, phase_id, option_id, emotion)
             )
 
+            # The session's cached response list is out of date now
+            clear_response_cache(session_id)
+
             # If emotion indicates distress, create a parent alert in the same transaction
             if emotion in ['angry', 'sad', 'negative']:
                 cursor.execute(
@@ -238,6 +238,7 @@ def record_emotion_detection(session_id, emotion, confidence):
                 """,
                 (session_id, emotion, confidence)
             )
+            _bump_detection_version(session_id)
             return cursor.lastrowid
     except sqlite3.Error as e:
         raise DatabaseError(f"Error recording emotion: {e}")
@@ -255,6 +256,7 @@ def record_attention_metric(session_id, attention_state, confidence):
                 """,
                 (session_id, attention_state, confidence)
             )
+            _bump_detection_version(session_id)
             return cursor.lastrowid
     except sqlite3.Error as e:
         raise DatabaseError(f"Error recording attention metric: {e}")
@@ -281,6 +283,22 @@ def create_parent_alert(session_id, scenario_id, phase_id, emotion):
 _cache_lock = threading.RLock()
 _cached_responses = {}
 
+# Per-session count of emotion/attention rows written, so cached reports can tell they are stale
+# (these rows come from the WebRTC writer thread, which can't touch session state)
+_detection_versions = {}
+
+
+def _bump_detection_version(session_id):
+    """Note that a new emotion or attention row was written for the session"""
+    with _cache_lock:
+        _detection_versions[session_id] = _detection_versions.get(session_id, 0) + 1
+
+
+def get_detection_version(session_id):
+    """Number of emotion/attention rows written for the session by this process"""
+    with _cache_lock:
+        return _detection_versions.get(session_id, 0)
+
 
 def get_session_responses(session_id):
     """Get all responses for a session with detailed information"""
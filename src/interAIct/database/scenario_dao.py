@@ -1,14 +1,11 @@
 import sqlite3
 import threading
+from itertools import groupby
 from database.db_schema import get_db_connection, DB_PATH
 
 # Thread-local storage for connections
 _thread_local = threading.local()
 
-# Cache with lock for thread safety
-_scenario_cache_lock = threading.RLock()
-_scenario_cache = {}
-
 
 class ScenarioDAO:
     """Thread-safe Data Access Object for scenarios, phases, options, and feedback"""
@@ -32,11 +29,7 @@ class ScenarioDAO:
 
     @staticmethod
     def get_all_scenarios():
-        """Retrieve all scenarios including image paths, thread-safe with caching"""
-        with _scenario_cache_lock:
-            if 'all_scenarios' in _scenario_cache:
-                return _scenario_cache['all_scenarios']
-
+        """Retrieve all scenarios including image paths (callers cache the result)"""
         conn = None
         try:
             conn = ScenarioDAO._get_thread_connection()
@@ -54,10 +47,6 @@ class ScenarioDAO:
                     "image_path": row[3]
                 })
 
-            # Update cache
-            with _scenario_cache_lock:
-                _scenario_cache['all_scenarios'] = scenarios
-
             return scenarios
         except sqlite3.Error as e:
             print(f"Database error in get_all_scenarios(): {e}")
@@ -65,12 +54,7 @@ class ScenarioDAO:
 
     @staticmethod
     def get_scenario_by_id(scenario_id):
-        """Retrieve a complete scenario including phases, options, and feedback"""
-        cache_key = f'scenario_{scenario_id}'
-        with _scenario_cache_lock:
-            if cache_key in _scenario_cache:
-                return _scenario_cache[cache_key]
-
+        """Retrieve a complete scenario including phases, options, and feedback (callers cache the result)"""
         conn = None
         try:
             conn = ScenarioDAO._get_thread_connection()
@@ -122,20 +106,86 @@ class ScenarioDAO:
                     'feedback': feedback
                 })
 
-            # Update cache
-            with _scenario_cache_lock:
-                _scenario_cache[cache_key] = scenario
-
             return scenario
         except sqlite3.Error as e:
             print(f"Database error in get_scenario_by_id(): {e}")
             return None
 
     @staticmethod
-    def clear_cache():
-        """Clear the entire scenario cache"""
-        with _scenario_cache_lock:
-            _scenario_cache.clear()
+    def get_all_scenarios_full():
+        """Retrieve every scenario with its phases, options, and feedback in a single query (callers cache the result)"""
+        conn = None
+        try:
+            conn = ScenarioDAO._get_thread_connection()
+            cursor = conn.cursor()
+
+            cursor.execute(
+                """
+                SELECT
+                    s.id AS scenario_id, s.title, s.description AS scenario_description, s.image_path,
+                    p.id AS phase_pk, p.phase_id, p.description AS phase_description, p.prompt,
+                    o.id AS option_pk, o.option_id, o.text AS option_text, o.icon, o.emotion, o.next_phase,
+                    f.text AS feedback_text, f.positive, f.guidance
+                FROM scenarios s
+                LEFT JOIN phases p ON p.scenario_id = s.id
+                LEFT JOIN options o ON o.phase_id = p.id
+                LEFT JOIN feedback f ON f.phase_id = p.id AND f.option_id = o.option_id
+                ORDER BY s.id, p.id, o.option_id
+                """
+            )
+
+            scenarios = []
+            for _, scenario_rows in groupby(cursor.fetchall(), key=lambda row: row['scenario_id']):
+                scenario_rows = list(scenario_rows)
+                first = scenario_rows[0]
+                scenario = {
+                    "id": first['scenario_id'],
+                    "title": first['title'],
+                    "description": first['scenario_description'],
+                    "image_path": first['image_path'],
+                    "phases": []
+                }
+
+                for phase_pk, phase_rows in groupby(scenario_rows, key=lambda row: row['phase_pk']):
+                    if phase_pk is None:
+                        continue  # Scenario without phases
+
+                    phase_rows = list(phase_rows)
+                    options = []
+                    feedback = {}
+                    for row in phase_rows:
+                        if row['option_pk'] is None:
+                            continue  # Phase without options
+                        options.append({
+                            'id': row['option_pk'],
+                            'phase_id': phase_pk,
+                            'option_id': row['option_id'],
+                            'text': row['option_text'],
+                            'icon': row['icon'],
+                            'emotion': row['emotion'],
+                            'next_phase': row['next_phase']
+                        })
+                        if row['feedback_text'] is not None:
+                            feedback[row['option_id']] = {
+                                'text': row['feedback_text'],
+                                'positive': bool(row['positive']),
+                                'guidance': bool(row['guidance'])
+                            }
+
+                    scenario['phases'].append({
+                        'phase_id': phase_rows[0]['phase_id'],
+                        'description': phase_rows[0]['phase_description'],
+                        'prompt': phase_rows[0]['prompt'],
+                        'options': options,
+                        'feedback': feedback
+                    })
+
+                scenarios.append(scenario)
+
+            return scenarios
+        except sqlite3.Error as e:
+            print(f"Database error in get_all_scenarios_full(): {e}")
+            return []
 
     @staticmethod
     def cleanup_thread():
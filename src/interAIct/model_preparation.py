@@ -10,7 +10,7 @@ class EmotionProcessor:
     This is a simplified version that simulates emotion detection for demonstration purposes.
     """
     
-    def __init__(self, model_path=None):
+    def __init__(self, model_path=None, simulate_latency=False):
         """Initialize the emotion detection model."""
         if model_path is None:
             # Get the current script's directory
@@ -23,6 +23,13 @@ class EmotionProcessor:
         
         # Emotion labels - using the original categories requested
         self.emotion_labels = ["natural", "anger", "fear", "joy", "sadness", "surprise"]
+        self._n = len(self.emotion_labels)
+        
+        # Random generator for the simulated probabilities
+        self._rng = np.random.default_rng()
+        
+        # Optionally sleep after each detection to mimic model inference time
+        self.simulate_latency = simulate_latency
         
         # Add state for more realistic simulation
         self.current_emotion = "natural"
@@ -34,42 +41,42 @@ class EmotionProcessor:
         self.attention_change_time = time.time()
         self.attention_duration = random.uniform(5.0, 15.0)  # Attention state lasts 5-15 seconds
         
+        # Model input dimensions
+        self.target_width = 224
+        self.target_height = 224
+        
         # Log initialization
         print(f"Emotion model initialized (simulated). Would use model at: {self.model_path}")
-        print(f"Target dimensions: 224x224, channels: 3")
+        print(f"Target dimensions: {self.target_width}x{self.target_height}, channels: 3")
     
     def preprocess_frame(self, frame):
         """Preprocess a video frame for the emotion model."""
-        # Make a copy to avoid modifying the original
-        processed_frame = frame.copy()
-        
-        # Convert BGR to RGB
-        processed_frame = cv2.cvtColor(processed_frame, cv2.COLOR_BGR2RGB)
-        
-        # Resize to target dimensions
-        processed_frame = cv2.resize(processed_frame, (224, 224))
-        
-        # Normalize pixel values
-        processed_frame = processed_frame.astype(np.float32) / 255.0
-        
-        # Convert from HWC to CHW format
-        processed_frame = np.transpose(processed_frame, (2, 0, 1))
-        
-        # Add batch dimension
-        processed_frame = np.expand_dims(processed_frame, axis=0)
-        
-        return processed_frame
+        # Grayscale frames are expanded so the model always gets 3 channels
+        if frame.ndim == 2:
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        
+        # Resize, BGR->RGB, normalize and NCHW layout in a single OpenCV call
+        return cv2.dnn.blobFromImage(
+            frame,
+            scalefactor=1.0 / 255.0,
+            size=(self.target_width, self.target_height),
+            swapRB=True,
+            crop=False
+        )
     
-    def run_emotion_detection(self, frame):
+    def infer(self, frame):
         """
-        Simulate running emotion detection on the given frame.
+        Simulate running the emotion model on the given frame.
         Provides a more realistic simulation with temporal consistency.
+        
+        Returns:
+            tuple: (probabilities array ordered like emotion_labels, execution time in ms)
         """
         # Start timing
         start_time = time.time()
         
         # Check if it's time to change emotion
-        if time.time() - self.emotion_change_time > self.emotion_duration:
+        if start_time - self.emotion_change_time > self.emotion_duration:
             # Time to change - pick a new emotion
             # Weights adjusted to favor natural and joy more than negative emotions
             weights = [0.5, 0.1, 0.1, 0.2, 0.05, 0.05]  # natural, anger, fear, joy, sadness, surprise
@@ -78,35 +85,43 @@ class EmotionProcessor:
             self.emotion_duration = random.uniform(3.0, 8.0)
         
         # Generate emotion probabilities with the current emotion being dominant
-        emotion_probs = np.random.rand(len(self.emotion_labels)) * 0.3  # Base probabilities
+        emotion_probs = self._rng.random(self._n, dtype=np.float32) * 0.3  # Base probabilities
         
         # Make the current emotion dominant
         current_emotion_idx = self.emotion_labels.index(self.current_emotion)
-        emotion_probs[current_emotion_idx] = random.uniform(0.6, 0.9)  # High confidence in current emotion
+        emotion_probs[current_emotion_idx] = self._rng.uniform(0.6, 0.9)  # High confidence in current emotion
         
         # Normalize to sum to 1
-        emotion_probs = emotion_probs / np.sum(emotion_probs)
-        
-        # Create a dictionary mapping emotions to probabilities
-        emotions = {}
-        for i, label in enumerate(self.emotion_labels):
-            emotions[label] = float(emotion_probs[i])
+        emotion_probs /= emotion_probs.sum()
         
-        # Add a brief random delay to simulate processing time
-        time.sleep(0.03)
+        # Add a brief delay to simulate processing time
+        if self.simulate_latency:
+            time.sleep(0.03)
         
         # Calculate execution time
-        end_time = time.time()
-        execution_time = (end_time - start_time) * 1000  # Convert to ms
+        execution_time = (time.time() - start_time) * 1000  # Convert to ms
         
-        # Return results
+        return emotion_probs, execution_time
+    
+    def dominant(self, probs):
+        """Return (label, confidence) of the most likely emotion without building the full map."""
+        idx = int(probs.argmax())
+        return self.emotion_labels[idx], float(probs[idx])
+    
+    def build_result(self, probs, execution_time):
+        """Build the full result dictionary from a probability array."""
+        dominant_emotion, confidence = self.dominant(probs)
         return {
-            "emotions": emotions,
-            "dominant_emotion": self.current_emotion,
-            "confidence": emotions[self.current_emotion],
+            "emotions": dict(zip(self.emotion_labels, probs.tolist())),
+            "dominant_emotion": dominant_emotion,
+            "confidence": confidence,
             "execution_time_ms": execution_time
         }
     
+    def run_emotion_detection(self, frame):
+        """Simulate running emotion detection and return the full result dictionary."""
+        return self.build_result(*self.infer(frame))
+    
     def process_attention(self, emotion_result, attention_history, max_history=10):
         """
         Determine attention state based on emotion results.
@@ -2,6 +2,13 @@ import streamlit as st
 from database import db_service as db
 from utils.session_manager import select_avatar
 
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_avatars():
+    """Load avatars from the database, cached so reruns don't hit SQLite"""
+    return db.get_avatars()
+
+
 def show_avatar_selection():
     """Display the avatar selection page"""
     st.markdown("<h1 style='text-align: center;'>Choose Your Friend!</h1>", unsafe_allow_html=True)
@@ -11,7 +18,7 @@ def show_avatar_selection():
 
     # Get avatars from the database instead of direct import
     try:
-        avatars = db.get_avatars()
+        avatars = load_avatars()
     except Exception as e:
         st.error(f"Failed to load avatars: {e}")
         avatars = []
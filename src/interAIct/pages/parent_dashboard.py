@@ -1,8 +1,181 @@
 import streamlit as st
 import pandas as pd
-from database import db_service as db
+import bisect
+from collections import Counter, namedtuple
+import numpy as np
 from database.scenario_dao import ScenarioDAO
-from pages.report import generate_report, calculate_attention_score
+from utils.session_manager import load_session_report, session_data_version
+from utils.report_data import calculate_attention_score, responses_frame, summarize_by_scenario
+
+# Fixed set of attention states reported by the emotion processor
+ATTENTION_STATES = pd.CategoricalDtype(["Attentive", "Partially Attentive", "Not Attentive", "Unknown"])
+
+# Chart value for each attention state, aligned with ATTENTION_STATES
+ATTENTION_VALUE_LUT = np.array([10, 5, 1, 3], dtype=np.int8)
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def _cached_all_scenarios_full():
+    """All scenarios with phases, options and feedback for the Scenarios tab, cached across reruns"""
+    return ScenarioDAO.get_all_scenarios_full()
+
+
+# Attention score thresholds and the quality label for each band
+ATTENTION_QUALITY_THRESHOLDS = (4, 6, 8)
+ATTENTION_QUALITY_LABELS = ("Needs Improvement", "Fair", "Good", "Excellent")
+
+# Precomputed values for the Child Progress metric widgets
+Metrics = namedtuple('Metrics', 'scenarios total pos guide attn attn_q')
+
+# Static markdown shown in the Child Progress tab
+EMOTION_LEGEND = """
+**Understanding the Emotion Categories:**
+- **Natural/Neutral**: Calm, balanced emotional state
+- **Joy/Happy**: Expressing happiness or excitement
+- **Sadness**: Expressing sadness or disappointment
+- **Anger**: Expressing frustration or anger
+- **Fear**: Expressing worry or fear
+- **Surprise**: Expressing astonishment or surprise
+"""
+
+ATTENTION_LEGEND = """
+**Attention States:**
+- **Attentive**: Child is fully engaged with the content
+- **Partially Attentive**: Child is somewhat distracted but still participating
+- **Not Attentive**: Child appears distracted or disengaged
+"""
+
+ATTENTION_RECOMMENDATIONS_LOW = """
+- Consider shorter learning sessions with more frequent breaks
+- Use more engaging, interactive learning materials
+- Try activities that specifically target focus and attention
+- Consider consulting with a specialist if attention difficulties persist
+"""
+
+ATTENTION_RECOMMENDATIONS_MID = """
+- Mix high-interest activities with more challenging ones
+- Use visual timers to help maintain focus for set periods
+- Incorporate movement breaks between learning activities
+"""
+
+ATTENTION_RECOMMENDATIONS_HIGH = """
+- Continue using engaging learning materials
+- Gradually increase the duration of focused activities
+- Encourage self-monitoring of attention
+"""
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _build_progress_artifacts(session_id, version):
+    """
+    Build everything the Child Progress tab displays for a session.
+    
+    Args:
+        session_id: The database session ID
+        version: session_data_version(session_id), which changes whenever a response or an
+                 emotion/attention row is recorded
+        
+    Returns:
+        dict: Tables, metrics and chart data, or None if there are no responses yet
+    """
+    # Get session responses from database
+    report_data = load_session_report(session_id, version)
+
+    if not report_data or not report_data.get('responses'):
+        return None
+
+    # Create a dataframe and deduplicate responses (scenario+phase+option)
+    # (responses_frame always provides every column used below)
+    report_df = responses_frame(report_data['responses'])
+    report_df = report_df.drop_duplicates(
+        subset=['scenario_id', 'phase_id', 'option_id'], keep='first').reset_index(drop=True)
+
+    # Group by scenario to show a cleaner summary
+    summary_df = summarize_by_scenario(report_df)
+
+    # Summary statistics, computed on the raw boolean columns before display formatting
+    total_scenarios = report_df['scenario_id'].nunique()
+    sums = report_df[['positive', 'guidance']].sum()
+    positive_choices, needed_guidance = int(sums['positive']), int(sums['guidance'])
+    total_responses = len(report_df)
+
+    # Format the dataframe for display
+    display_columns = {
+        'scenario_title': 'Scenario',
+        'phase_description': 'Phase',
+        'option_text': 'Response',
+        'emotion': 'Emotion',
+        'feedback_text': 'Feedback',
+        'positive': 'Positive Choice',
+        'guidance': 'Needed Guidance',
+        'timestamp': 'Time'
+    }
+
+    # Select and rename columns without copying; formatted columns below are assigned as new arrays
+    display_df = report_df.loc[:, list(display_columns)].rename(columns=display_columns, copy=False)
+
+    # Format boolean columns (already plain bool from responses_frame)
+    display_df['Positive Choice'] = np.where(display_df['Positive Choice'], 'Yes', 'No')
+    display_df['Needed Guidance'] = np.where(display_df['Needed Guidance'], 'Yes', 'No')
+    display_df['Emotion'] = display_df['Emotion'].fillna('').astype(str).str.capitalize().replace('', 'Unknown')
+
+    # Low-cardinality columns as categoricals so st.dataframe's Arrow conversion skips per-object encoding
+    # (text columns are already Arrow-backed strings from responses_frame)
+    display_df = display_df.astype({col: 'category' for col in ('Emotion', 'Positive Choice', 'Needed Guidance')})
+
+    # Emotion distribution
+    emotion_counts = None
+    if report_data.get('emotion_detections'):
+        # Only the counts are needed, so count the raw records directly
+        # (only capitalize the emotion, don't remap it)
+        counts = Counter((d.get('emotion') or 'unknown').capitalize() for d in report_data['emotion_detections'])
+        emotion_counts = pd.DataFrame(counts.most_common(), columns=['Emotion', 'Count'])
+
+    # Attention score, distribution and timeline
+    attention_score = None
+    attention_counts = None
+    attention_over_time = None
+    if report_data.get('attention_metrics'):
+        attention_df = pd.DataFrame(report_data['attention_metrics'])
+
+        # Score on the raw states (this function is already cached), before unknown ones become NaN
+        attention_score = calculate_attention_score(attention_df)
+
+        attention_df['attention_state'] = attention_df['attention_state'].astype(ATTENTION_STATES)
+        
+        attention_counts = attention_df['attention_state'].value_counts()
+        attention_counts = attention_counts[attention_counts > 0].rename_axis('Attention State').reset_index(name='Count')
+        
+        if len(attention_df) > 5:
+            # Convert attention states to numeric values (unrecognized states count as Unknown)
+            codes = attention_df['attention_state'].cat.codes.to_numpy()
+            
+            # The default RangeIndex serves as the sequence axis
+            attention_over_time = pd.Series(ATTENTION_VALUE_LUT[np.where(codes < 0, 3, codes)], name='attention_value')
+
+    attention_quality = None
+    if attention_score is not None:
+        attention_quality = ATTENTION_QUALITY_LABELS[
+            bisect.bisect_right(ATTENTION_QUALITY_THRESHOLDS, attention_score)
+        ]
+
+    metrics = Metrics(
+        scenarios=total_scenarios,
+        total=total_responses,
+        pos=f"{positive_choices}/{total_responses}",
+        guide=f"{needed_guidance}/{total_responses}",
+        attn=attention_score,
+        attn_q=attention_quality
+    )
+
+    return {
+        'summary_df': summary_df,
+        'display_df': display_df,
+        'metrics': metrics,
+        'emotion_counts': emotion_counts,
+        'attention_counts': attention_counts,
+        'attention_over_time': attention_over_time
+    }
 
 
 def show_parent_dashboard():
@@ -36,225 +209,85 @@ def show_parent_dashboard():
     with tabs[0]:
         st.markdown("<h2>Child Progress</h2>", unsafe_allow_html=True)
 
-        # Try to get reports from database
-        try:
-            # Get session responses from database
-            report_data = db.generate_report(st.session_state.db_session_id)
-
-            if report_data and report_data.get('responses'):
-                # Deduplicate responses
-                responses = report_data['responses']
-                unique_responses = []
-                seen_keys = set()
-
-                for resp in responses:
-                    # Create a unique key for each response (scenario+phase+option)
-                    key = (resp.get('scenario_id'), resp.get('phase_id'), resp.get('option_id'))
-                    if key not in seen_keys:
-                        seen_keys.add(key)
-                        unique_responses.append(resp)
-
-                # Create a dataframe from the deduped responses
-                report_df = pd.DataFrame(unique_responses)
-
-                # Group by scenario to show a cleaner summary
-                if 'scenario_title' in report_df.columns:
-                    summary_df = report_df.groupby('scenario_title').agg({
-                        'positive': lambda x: sum(x),
-                        'guidance': lambda x: sum(x),
-                        'id': 'count'
-                    }).reset_index()
-
-                    summary_df = summary_df.rename(columns={
-                        'scenario_title': 'Scenario',
-                        'positive': 'Positive Choices',
-                        'guidance': 'Needed Guidance',
-                        'id': 'Total Interactions'
-                    })
+        # Skip the database entirely until something has been recorded this session
+        if not st.session_state.get('response_count'):
+            st.info("No activity data available yet. Have your child complete some scenarios to see progress.")
+        else:
+            # Try to get reports from database
+            try:
+                # Pandas work is cached per session and only redone after new responses or detections
+                session_id = st.session_state.db_session_id
+                progress = _build_progress_artifacts(session_id, session_data_version(session_id))
 
+                if progress:
                     # Display the grouped summary first
                     st.subheader("Scenario Summary")
-                    st.dataframe(summary_df, use_container_width=True)
+                    st.dataframe(progress['summary_df'], use_container_width=True)
 
                     # Then display detailed responses
                     st.subheader("Detailed Responses")
 
-                # Format the dataframe for display
-                display_columns = {
-                    'scenario_title': 'Scenario',
-                    'phase_description': 'Phase',
-                    'option_text': 'Response',
-                    'emotion': 'Emotion',
-                    'feedback_text': 'Feedback',
-                    'positive': 'Positive Choice',
-                    'guidance': 'Needed Guidance',
-                    'timestamp': 'Time'
-                }
-
-                # Select and rename columns
-                available_columns = [col for col in display_columns.keys() if col in report_df.columns]
-                display_df = report_df[available_columns].copy()
-                display_df = display_df.rename(columns={col: display_columns[col] for col in available_columns})
-
-                # Format boolean columns
-                if 'Positive Choice' in display_df.columns:
-                    display_df['Positive Choice'] = display_df['Positive Choice'].map(lambda x: 'Yes' if x else 'No')
-                if 'Needed Guidance' in display_df.columns:
-                    display_df['Needed Guidance'] = display_df['Needed Guidance'].map(lambda x: 'Yes' if x else 'No')
-                if 'Emotion' in display_df.columns:
-                    display_df['Emotion'] = display_df['Emotion'].apply(lambda x: x.capitalize() if x else "Unknown")
-
-                st.dataframe(display_df, use_container_width=True)
-
-                # Summary statistics
-                total_scenarios = len(display_df['Scenario'].unique())
-                positive_choices = (display_df[
-                                        "Positive Choice"] == "Yes").sum() if "Positive Choice" in display_df.columns else 0
-                needed_guidance = (display_df[
-                                       "Needed Guidance"] == "Yes").sum() if "Needed Guidance" in display_df.columns else 0
-                total_responses = len(display_df)
-
-                # Display metrics
-                st.subheader("Key Metrics")
-                col1, col2, col3, col4 = st.columns(4)
-                with col1:
-                    st.metric(label="Unique Scenarios", value=total_scenarios)
-                with col2:
-                    st.metric(label="Total Responses", value=total_responses)
-                with col3:
-                    st.metric(label="Positive Choices", value=f"{positive_choices}/{total_responses}")
-                with col4:
-                    st.metric(label="Needed Guidance", value=f"{needed_guidance}/{total_responses}")
+                    st.dataframe(progress['display_df'], use_container_width=True)
+
+                    # Display metrics
+                    m = progress['metrics']
+                    st.subheader("Key Metrics")
+                    col1, col2, col3, col4 = st.columns(4)
+                    col1.metric(label="Unique Scenarios", value=m.scenarios)
+                    col2.metric(label="Total Responses", value=m.total)
+                    col3.metric(label="Positive Choices", value=m.pos)
+                    col4.metric(label="Needed Guidance", value=m.guide)
                 
-                # Display emotion data if available
-                if 'emotion_detections' in report_data and report_data['emotion_detections']:
-                    st.subheader("Emotion Analysis")
+                    # Display emotion data if available
+                    emotion_counts = progress['emotion_counts']
+                    if emotion_counts is not None:
+                        st.subheader("Emotion Analysis")
                     
-                    # Create DataFrame
-                    emotion_df = pd.DataFrame(report_data['emotion_detections'])
+                        # Display chart
+                        st.bar_chart(emotion_counts.set_index('Emotion'))
                     
-                    # Only capitalize the emotion, don't remap it
-                    if 'emotion' in emotion_df.columns:
-                        emotion_df['emotion'] = emotion_df['emotion'].apply(
-                            lambda x: x.capitalize() if isinstance(x, str) else "Unknown"
-                        )
+                        # Show most common emotions
+                        st.markdown(f"**Most frequent emotions:** {', '.join(emotion_counts['Emotion'].head(3).tolist())}")
                     
-                    # Show emotion distribution
-                    emotion_counts = emotion_df['emotion'].value_counts().reset_index()
-                    emotion_counts.columns = ['Emotion', 'Count']
-                    
-                    # Display chart
-                    st.bar_chart(emotion_counts.set_index('Emotion'))
-                    
-                    # Show most common emotions
-                    st.markdown(f"**Most frequent emotions:** {', '.join(emotion_counts['Emotion'].head(3).tolist())}")
-                    
-                    # Add detailed description of what the emotions mean
-                    st.markdown("""
-                    **Understanding the Emotion Categories:**
-                    - **Natural/Neutral**: Calm, balanced emotional state
-                    - **Joy/Happy**: Expressing happiness or excitement
-                    - **Sadness**: Expressing sadness or disappointment
-                    - **Anger**: Expressing frustration or anger
-                    - **Fear**: Expressing worry or fear
-                    - **Surprise**: Expressing astonishment or surprise
-                    """)
+                        # Add detailed description of what the emotions mean
+                        st.markdown(EMOTION_LEGEND)
                 
-                # Display attention metrics if available
-                if 'attention_metrics' in report_data and report_data['attention_metrics']:
-                    st.subheader("Attention Analysis")
+                    # Display attention metrics if available
+                    attention_score = m.attn
+                    if attention_score is not None:
+                        st.subheader("Attention Analysis")
                     
-                    # Create DataFrame
-                    attention_df = pd.DataFrame(report_data['attention_metrics'])
+                        # Display score and its interpretation
+                        col1, col2 = st.columns(2)
+                        col1.metric(label="Overall Attention Score", value=f"{attention_score:.1f}/10")
+                        col2.metric(label="Attention Quality", value=m.attn_q)
                     
-                    # Calculate attention score
-                    attention_score = calculate_attention_score(attention_df)
+                        # Display chart
+                        st.bar_chart(progress['attention_counts'].set_index('Attention State'))
                     
-                    # Display score
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.metric(label="Overall Attention Score", value=f"{attention_score:.1f}/10")
+                        # Display attention state descriptions
+                        st.markdown(ATTENTION_LEGEND)
                     
-                    with col2:
-                        # Interpret score
-                        if attention_score >= 8:
-                            attention_quality = "Excellent"
-                        elif attention_score >= 6:
-                            attention_quality = "Good"
-                        elif attention_score >= 4:
-                            attention_quality = "Fair"
-                        else:
-                            attention_quality = "Needs Improvement"
-                        
-                        st.metric(label="Attention Quality", value=attention_quality)
+                        # Display attention over time if enough data points
+                        if progress['attention_over_time'] is not None:
+                            st.subheader("Attention Over Time")
+                            st.line_chart(progress['attention_over_time'])
                     
-                    # Show attention distribution
-                    attention_counts = attention_df['attention_state'].value_counts().reset_index()
-                    attention_counts.columns = ['Attention State', 'Count']
+                        # Recommendations based on attention
+                        st.markdown("### Attention Recommendations")
                     
-                    # Display chart
-                    st.bar_chart(attention_counts.set_index('Attention State'))
-                    
-                    # Display attention state descriptions
-                    st.markdown("""
-                    **Attention States:**
-                    - **Attentive**: Child is fully engaged with the content
-                    - **Partially Attentive**: Child is somewhat distracted but still participating
-                    - **Not Attentive**: Child appears distracted or disengaged
-                    """)
-                    
-                    # Display attention over time if enough data points
-                    if len(attention_df) > 5:
-                        st.subheader("Attention Over Time")
-                        
-                        # Create numeric mapping for attention states
-                        attention_values = {
-                            "Attentive": 10,
-                            "Partially Attentive": 5,
-                            "Not Attentive": 1,
-                            "Unknown": 3
-                        }
-                        
-                        # Convert attention states to numeric values
-                        if 'attention_state' in attention_df.columns:
-                            attention_df['attention_value'] = attention_df['attention_state'].map(
-                                lambda x: attention_values.get(x, 3)
-                            )
-                            
-                            # Add sequence number if timestamp isn't usable
-                            attention_df['sequence'] = range(len(attention_df))
-                            
-                            # Display line chart
-                            st.line_chart(attention_df.set_index('sequence')['attention_value'])
-                    
-                    # Recommendations based on attention
-                    st.markdown("### Attention Recommendations")
-                    
-                    if attention_score < 5:
-                        st.markdown("""
-                        - Consider shorter learning sessions with more frequent breaks
-                        - Use more engaging, interactive learning materials
-                        - Try activities that specifically target focus and attention
-                        - Consider consulting with a specialist if attention difficulties persist
-                        """)
-                    elif attention_score < 7:
-                        st.markdown("""
-                        - Mix high-interest activities with more challenging ones
-                        - Use visual timers to help maintain focus for set periods
-                        - Incorporate movement breaks between learning activities
-                        """)
-                    else:
-                        st.markdown("""
-                        - Continue using engaging learning materials
-                        - Gradually increase the duration of focused activities
-                        - Encourage self-monitoring of attention
-                        """)
-            else:
-                st.info("No activity data available yet. Have your child complete some scenarios to see progress.")
-        except Exception as e:
-            st.error(f"Error retrieving reports: {e}")
-            # Fall back to session state data if database failed
-            fallback_to_session_state_reports()
+                        if attention_score < 5:
+                            st.markdown(ATTENTION_RECOMMENDATIONS_LOW)
+                        elif attention_score < 7:
+                            st.markdown(ATTENTION_RECOMMENDATIONS_MID)
+                        else:
+                            st.markdown(ATTENTION_RECOMMENDATIONS_HIGH)
+                else:
+                    st.info("No activity data available yet. Have your child complete some scenarios to see progress.")
+            except Exception as e:
+                st.error(f"Error retrieving reports: {e}")
+                # Fall back to session state data if database failed
+                fallback_to_session_state_reports()
 
     # Rest of the function remains the same
     with tabs[1]:
@@ -262,21 +295,18 @@ def show_parent_dashboard():
 
         # Get scenarios from database
         try:
-            scenarios = ScenarioDAO.get_all_scenarios()
+            # Full scenario details with options and feedback, fetched in one query
+            scenarios = _cached_all_scenarios_full()
 
             for scenario in scenarios:
                 with st.expander(f"{scenario['id']}. {scenario['title']}"):
-                    st.markdown(f"<p><strong>Description:</strong> {scenario['description']}</p>",
-                                unsafe_allow_html=True)
+                    # Build the whole expander body and send it in a single markdown call
+                    parts = [f"<p><strong>Description:</strong> {scenario['description']}</p>"]
 
-                    # Get full scenario details with options and feedback
-                    full_scenario = ScenarioDAO.get_scenario_by_id(scenario['id'])
-
-                    if full_scenario and 'phases' in full_scenario:
-                        for phase in full_scenario['phases']:
-                            st.markdown(f"<p><strong>Phase:</strong> {phase['description']}</p>",
-                                        unsafe_allow_html=True)
-                            st.markdown("<p><strong>Options:</strong></p>", unsafe_allow_html=True)
+                    if scenario['phases']:
+                        for phase in scenario['phases']:
+                            parts.append(f"<p><strong>Phase:</strong> {phase['description']}</p>")
+                            parts.append("<p><strong>Options:</strong></p><ul>")
 
                             for option in phase['options']:
                                 option_id = option['option_id']
@@ -284,11 +314,13 @@ def show_parent_dashboard():
                                 if option_id in phase['feedback']:
                                     feedback = phase['feedback'][option_id]
                                     positive = "✅ Positive" if feedback.get("positive", False) else "⚠️ Needs Guidance"
-                                    st.markdown(f"- Option {option_id.upper()}: {option['text']} ({positive})",
-                                                unsafe_allow_html=True)
+                                    parts.append(f"<li>Option {option_id.upper()}: {option['text']} ({positive})</li>")
+
+                            parts.append("</ul>")
                     else:
-                        st.markdown("<p>No detailed information available for this scenario.</p>",
-                                    unsafe_allow_html=True)
+                        parts.append("<p>No detailed information available for this scenario.</p>")
+
+                    st.markdown("".join(parts), unsafe_allow_html=True)
         except Exception as e:
             st.error(f"Error loading scenarios: {e}")
             st.markdown("<p>Could not load scenarios from database.</p>", unsafe_allow_html=True)
@@ -2,17 +2,20 @@ import streamlit as st
 from datetime import datetime
 import time
 import os
+import re
+import logging
 from database import db_service as db
 from database.scenario_dao import ScenarioDAO
 from utils.session_manager import record_response
-from pages.tts_helper import text_to_speech, auto_play_prompt
+from pages.tts_helper import cached_text_to_speech, prefetch_tts, auto_play_prompt
 # Update import to use WebRTC-based emotion detection
 from utils.webrtc_emotion_detection import get_emotion_feedback
 
 
-def add_custom_css():
-    """Add custom CSS for enhanced UI elements"""
-    st.markdown("""
+logger = logging.getLogger(__name__)
+
+# Custom CSS for enhanced UI elements
+CUSTOM_CSS = """
     <style>
         /* Option card styling */
         .option-card {
@@ -69,23 +72,48 @@ def add_custom_css():
             display: block !important;
         }
     </style>
-    """, unsafe_allow_html=True)
+"""
 
 
-# Cache for scenarios
-_scenario_cache = {}
+def add_custom_css():
+    """Add custom CSS for enhanced UI elements"""
+    # Emitted on every run: Streamlit removes elements a rerun doesn't re-emit
+    st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
+
+
+@st.cache_resource(ttl=3600, max_entries=256, show_spinner=False)
+def _get_scenario_cached(scenario_id):
+    """
+    Load a scenario once and share it across reruns and sessions without copying.
+    Missing scenarios raise so they are not cached; callers must not mutate the result.
+    """
+    scenario = ScenarioDAO.get_scenario_by_id(scenario_id)
+    if not scenario:
+        raise LookupError(scenario_id)
+
+    # The DAO builds a fresh scenario on every call, so the lookup helpers are added in place
+    for p in scenario['phases']:
+        p['_option_labels'] = [f"{c.get('icon', '🔹')} {c['text']}" for c in p['options']]
+    scenario['_phase_index'] = {p['phase_id']: p for p in scenario['phases']}
+    scenario['_first_phase_id'] = scenario['phases'][0]['phase_id'] if scenario['phases'] else None
+    return scenario
+
+
+@st.cache_resource(ttl=3600, show_spinner=False)
+def _get_all_scenarios_cached():
+    """Load the shared, read-only scenario list; an empty result raises so it is retried"""
+    scenarios = ScenarioDAO.get_all_scenarios()
+    if not scenarios:
+        raise LookupError("no scenarios")
+    return scenarios
 
 
 def get_scenario(scenario_id):
     """Get a scenario with caching"""
-    if scenario_id in _scenario_cache:
-        return _scenario_cache[scenario_id]
-
     try:
-        scenario = ScenarioDAO.get_scenario_by_id(scenario_id)
-        if scenario:
-            _scenario_cache[scenario_id] = scenario
-        return scenario
+        return _get_scenario_cached(scenario_id)
+    except LookupError:
+        return None
     except Exception as e:
         st.error(f"Failed to load scenario details: {e}")
         return None
@@ -93,131 +121,223 @@ def get_scenario(scenario_id):
 
 def get_all_scenarios():
     """Get all scenarios with caching"""
-    if 'all_scenarios' in _scenario_cache:
-        return _scenario_cache['all_scenarios']
-
     try:
-        scenarios = ScenarioDAO.get_all_scenarios()
-        if scenarios:
-            _scenario_cache['all_scenarios'] = scenarios
-        return scenarios
+        return _get_all_scenarios_cached()
+    except LookupError:
+        return []
     except Exception as e:
         st.error(f"Failed to load scenarios: {e}")
         return []
 
 
+# Scenario phase videos are named scenario_<scenario id>_phase_<phase id>.<ext>
+VIDEO_FILENAME_PATTERN = re.compile(r"^scenario_(\d+)_phase_(.+)\.(mp4|webm|ogg)$")
+VIDEO_EXT_PRIORITY = {'mp4': 0, 'webm': 1, 'ogg': 2}
+VIDEO_EXTS = tuple(f".{ext}" for ext in VIDEO_EXT_PRIORITY)
+
+
+@st.cache_resource(show_spinner=False)
+def _build_video_index(video_dir="videos"):
+    """Scan the video directory once and map (scenario_id, phase_id) to a video path"""
+    index = {}
+    best = {}
+    try:
+        with os.scandir(video_dir) as entries:
+            for entry in entries:
+                # Cheap suffix check before the regex so unrelated files are skipped quickly
+                if not entry.name.endswith(VIDEO_EXTS):
+                    continue
+                match = VIDEO_FILENAME_PATTERN.match(entry.name)
+                if not match or not entry.is_file():
+                    continue
+                key = (int(match.group(1)), match.group(2))
+                priority = VIDEO_EXT_PRIORITY[match.group(3)]
+                # Prefer mp4, then webm, then ogg when a phase has several formats
+                if key not in best or priority < best[key]:
+                    best[key] = priority
+                    index[key] = entry.path
+    except FileNotFoundError:
+        pass
+    return index
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _video_bytes(video_path):
+    """Read a phase video once so reruns don't reload it from disk"""
+    with open(video_path, 'rb') as video_file:
+        return video_file.read()
+
+
 def get_video_path(scenario_id, phase_id):
-    """Get the path to the video for the given scenario phase"""
-    video_dir = "videos"
-    base_filename = f"scenario_{scenario_id}_phase_{phase_id}"
+    """Get the path to the video for the given scenario phase (empty string if there is none)"""
+    return _build_video_index().get((int(scenario_id), phase_id), "")
+
+
+# Emoji shown next to the detected mood
+EMOTION_EMOJIS = {
+    "happy": "😊",
+    "neutral": "😐",
+    "negative": "😢",
+    "thoughtful": "🤔"
+}
 
-    # Check multiple video formats
-    for ext in ['.mp4', '.webm', '.ogg']:
-        video_path = os.path.join(video_dir, base_filename + ext)
-        if os.path.exists(video_path):
-            return video_path
+# Supportive banner (st element kind, message) shown for a detected emotion
+EMOTION_BANNERS = {
+    "negative": ("warning", "I notice you seem a bit upset. Would you like to take a short break or talk about how you're feeling?"),
+    "happy": ("success", "I can see you're enjoying this! That's wonderful!")
+}
 
-    # Return empty string if no video exists
-    return ""
+# HTML templates for the mood panel and the avatar's prompt
+MOOD_TEMPLATE = """
+<div class="emotion-feedback">
+    <div style="display: flex; align-items: center;">
+        <div style="font-size: 30px; margin-right: 10px;">{emoji}</div>
+        <div>
+            <strong>Current mood:</strong> {label}
+        </div>
+    </div>
+</div>
+"""
+
+AVATAR_PROMPT_TEMPLATE = (
+    "<div class='avatar-message'><h2>{name} asks:</h2>"
+    "<p style='font-size: 20px;'>{prompt}</p></div>"
+)
+
+
+def _camera_on():
+    """Whether live emotion detection is running for this session"""
+    s = st.session_state
+    return s.get('camera_enabled', False) and s.get('webrtc_ctx_active', False)
+
+
+# Minimum time between emotion reads; faster reruns reuse the last value
+EMOTION_REFRESH_INTERVAL_S = 0.75
+
+
+def _emotion_throttled():
+    """get_emotion_feedback() debounced per session so rerun bursts reuse the last reading"""
+    now = time.monotonic()
+    last_t, last_v = st.session_state.get('_emo_cache', (0.0, None))
+    if last_v is not None and now - last_t < EMOTION_REFRESH_INTERVAL_S:
+        return last_v
+    v = get_emotion_feedback()
+    st.session_state['_emo_cache'] = (now, v)
+    return v
+
+
+def compute_is_terminal(phase, completed):
+    """A phase ends the scenario if it is "exit", starts with "end_", or the scenario was completed"""
+    return phase == "exit" or (phase or "").startswith("end_") or bool(completed)
 
 
 def handle_option_selection(option, current_phase, scenario_id, scenario_index, scenarios):
-    """Handle option selection and page navigation"""
-    # Get detected emotion if camera is enabled
+    """
+    Handle option selection and page navigation.
+    Runs as the option button's on_click callback, so no extra st.rerun() is needed.
+    option and current_phase come from the shared scenario cache and are only read here.
+    """
+    s = st.session_state
+
+    # Get detected emotion if camera is enabled, read at click time rather than render time
     detected_emotion = None
-    if st.session_state.get('camera_enabled', False) and st.session_state.get('webrtc_ctx_active', False):
-        detected_emotion = get_emotion_feedback()
+    response_emotion = option.get('emotion')
+    if _camera_on():
+        detected_emotion = _emotion_throttled()
         # Override option emotion if detected
         if detected_emotion:
-            option['emotion'] = detected_emotion
+            response_emotion = detected_emotion
             
         # Log the detected emotion
-        print(f"Detected emotion: {detected_emotion}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Detected emotion: %s", detected_emotion)
     
+    opt_id = option['option_id']
+
     # Record the response in the database
     try:
         record_response(
             scenario_id,
             current_phase['phase_id'],
-            option['option_id'],
-            option.get('emotion')
+            opt_id,
+            response_emotion
         )
-    except Exception as e:
-        print(f"Error recording response: {e}")
+    except Exception:
+        logger.exception("Error recording response")
 
     # Handle the next phase transition
     next_phase = option.get('next_phase')
 
     # Check if next_phase is "real_exit" which means scenario is complete
     if next_phase == "real_exit":
-        st.session_state.scenario_completed = True
+        s.scenario_completed = True
 
         # Advance to next scenario on next visit
-        current_index = st.session_state.current_scenario_index
-        if 'scenario_completed_indexes' not in st.session_state:
-            st.session_state.scenario_completed_indexes = []
-
-        if current_index not in st.session_state.scenario_completed_indexes:
-            st.session_state.scenario_completed_indexes.append(current_index)
+        current_index = s.current_scenario_index
+        s.setdefault('scenario_completed_indexes', set()).add(current_index)
 
         # Setup for next scenario
         if current_index < len(scenarios) - 1:
-            st.session_state.current_scenario_index = current_index + 1
+            s.current_scenario_index = current_index + 1
             # Reset current phase for next scenario
-            if 'current_phase' in st.session_state:
-                del st.session_state.current_phase
+            if 'current_phase' in s:
+                del s.current_phase
         else:
             # No more scenarios, will go to report
             pass
 
         # Set exit phase for feedback
-        st.session_state.current_phase = "exit"
+        s.current_phase = "exit"
 
     # Regular phase transition handling
     elif next_phase == "restart":
         # Get the first phase of the scenario instead of hardcoding "entering"
         scenario = get_scenario(scenario_id)
-        if scenario and scenario['phases'] and len(scenario['phases']) > 0:
-            st.session_state.current_phase = scenario['phases'][0]['phase_id']
+        if scenario and scenario['_first_phase_id'] is not None:
+            s.current_phase = scenario['_first_phase_id']
         else:
             # If we can't find the first phase, just go to exit
-            st.session_state.current_phase = "exit"
+            s.current_phase = "exit"
     elif next_phase == "end_waiting" or next_phase == "end_no_slide":
         # These are exit paths - mark as complete and move to next scenario
-        st.session_state.current_phase = next_phase  # Use the actual exit phase
+        s.current_phase = next_phase  # Use the actual exit phase
     elif next_phase == "waiting_reminder":
         # Special case for the waiting reminder - it should advance to sliding afterwards
         # Store that we're in a reminder phase
-        st.session_state.reminder_phase = True
-        st.session_state.next_after_reminder = "sliding"
-        st.session_state.current_phase = next_phase
+        s.reminder_phase = True
+        s.next_after_reminder = "sliding"
+        s.current_phase = next_phase
     elif next_phase:
         # Regular phase transition - store the next phase
-        st.session_state.current_phase = next_phase
+        s.current_phase = next_phase
     else:
         # No next_phase specified - assume we should advance to the next scenario
-        st.session_state.current_phase = "exit"
+        s.current_phase = "exit"
+
+    # Decide once whether the phase we just moved to ends the scenario; the feedback page reads this
+    s.is_terminal_phase = compute_is_terminal(s.get('current_phase'), s.get('scenario_completed', False))
 
     # Save the feedback in session state for the feedback page
-    feedback_text = current_phase['feedback'].get(option['option_id'], {}).get('text', 'Great choice!')
-    is_positive = current_phase['feedback'].get(option['option_id'], {}).get('positive', True)
-    needs_guidance = current_phase['feedback'].get(option['option_id'], {}).get('guidance', False)
+    fb = current_phase['feedback'].get(opt_id) or {}
+    feedback_text = fb.get('text', 'Great choice!')
+    is_positive = fb.get('positive', True)
+    needs_guidance = fb.get('guidance', False)
     
     # Store feedback information
-    st.session_state.temp_feedback = {
+    s.temp_feedback = {
         'text': feedback_text,
         'positive': is_positive,
         'guidance': needs_guidance,
         'emotion': detected_emotion
     }
 
-    # Navigate to feedback page
-    st.session_state.page = 'phase_feedback'
-    st.rerun()
+    # Navigate to feedback page (the run that follows this callback renders it)
+    s.page = 'phase_feedback'
 
 
 def show_phase_based_scenario(scenario_index):
     """Display a phase-based social skills scenario with multiple steps and automatic flow"""
+    s = st.session_state
     
     # Apply custom CSS
     add_custom_css()
@@ -231,7 +351,7 @@ def show_phase_based_scenario(scenario_index):
 
         # Validate scenario index
         if not scenarios or scenario_index >= len(scenarios):
-            st.session_state.page = 'report'
+            s.page = 'report'
             st.rerun()
             return
 
@@ -241,37 +361,44 @@ def show_phase_based_scenario(scenario_index):
         scenario = get_scenario(scenario_id)
         if not scenario:
             st.error(f"Scenario with ID {scenario_id} not found")
-            st.session_state.page = 'report'
+            s.page = 'report'
             st.rerun()
             return
 
         # Initialize current phase if needed
-        if 'current_phase' not in st.session_state:
+        if 'current_phase' not in s:
             # Get the first phase instead of hardcoding "entering"
-            if scenario['phases'] and len(scenario['phases']) > 0:
+            if scenario['_first_phase_id'] is not None:
                 # Use the first phase in the list
-                st.session_state.current_phase = scenario['phases'][0]['phase_id']
+                s.current_phase = scenario['_first_phase_id']
             else:
                 st.error("No phases found in this scenario")
-                st.session_state.page = 'scenario_selection'
+                s.page = 'scenario_selection'
                 st.rerun()
                 return
 
         # Store scenario in session
-        st.session_state.current_scenario_id = scenario_id
+        s.current_scenario_id = scenario_id
+
+        # Generate every phase prompt's audio in the background the first time this scenario is shown
+        if s.get('sound_enabled', True):
+            avatar_name = s.selected_avatar['name']
+            prefetched = s.setdefault('_tts_prefetched', set())
+            if (scenario_id, avatar_name) not in prefetched:
+                prefetched.add((scenario_id, avatar_name))
+                prefetch_tts([f"{avatar_name} asks: {phase['prompt']}" for phase in scenario['phases']])
 
         # Find the current phase
-        current_phase = next((phase for phase in scenario['phases']
-                              if phase['phase_id'] == st.session_state.current_phase), None)
+        current_phase = scenario['_phase_index'].get(s.current_phase)
 
         if not current_phase:
-            st.error(f"Phase '{st.session_state.current_phase}' not found in scenario.")
+            st.error(f"Phase '{s.current_phase}' not found in scenario.")
             # Reset to first phase instead of hardcoding "entering"
-            if scenario['phases'] and len(scenario['phases']) > 0:
-                st.session_state.current_phase = scenario['phases'][0]['phase_id']
+            if scenario['_first_phase_id'] is not None:
+                s.current_phase = scenario['_first_phase_id']
                 st.rerun()
             else:
-                st.session_state.page = 'scenario_selection'
+                s.page = 'scenario_selection'
                 st.rerun()
             return
 
@@ -279,104 +406,81 @@ def show_phase_based_scenario(scenario_index):
         st.markdown(f"<h1>{scenario['title']}</h1>", unsafe_allow_html=True)
         st.markdown(f"<p style='font-size: 20px;'>{current_phase['description']}</p>", unsafe_allow_html=True)
 
+        # Read the detected emotion once per render and reuse it below
+        camera_on = _camera_on()
+        current_emotion = None
+        if camera_on:
+            try:
+                current_emotion = _emotion_throttled()
+            except Exception:
+                logger.exception("Error getting emotion feedback")
+
         # Display current emotion if enabled
-        if st.session_state.get('camera_enabled', False) and st.session_state.get('webrtc_ctx_active', False):
+        if current_emotion:
             try:
-                # Get emotion feedback
-                emotion = get_emotion_feedback()
-                
-                # Map emotions to emojis
-                emotion_emojis = {
-                    "happy": "😊",
-                    "neutral": "😐",
-                    "negative": "😢",
-                    "thoughtful": "🤔"
-                }
-                
-                emoji = emotion_emojis.get(emotion, "😐")
-                
-                # Display current emotion
-                st.markdown(f"""
-                <div class="emotion-feedback">
-                    <div style="display: flex; align-items: center;">
-                        <div style="font-size: 30px; margin-right: 10px;">{emoji}</div>
-                        <div>
-                            <strong>Current mood:</strong> {emotion.capitalize()}
-                        </div>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-            except Exception as e:
-                print(f"Error displaying emotion: {e}")
+                st.markdown(
+                    MOOD_TEMPLATE.format(
+                        emoji=EMOTION_EMOJIS.get(current_emotion, "😐"),
+                        label=current_emotion.capitalize()
+                    ),
+                    unsafe_allow_html=True
+                )
+            except Exception:
+                logger.exception("Error displaying emotion")
 
         # Embed video - video plays automatically with st.video
         video_path = get_video_path(scenario_id, current_phase['phase_id'])
         if video_path:
-            st.video(video_path, start_time=0)
+            video_format = f"video/{os.path.splitext(video_path)[1][1:]}"
+            st.video(_video_bytes(video_path), format=video_format, start_time=0)
         else:
             st.image(scenario['image_path'], use_column_width=True)
 
         # Display prompt
         st.markdown(
-            f"<div class='avatar-message'><h2>{st.session_state.selected_avatar['name']} asks:</h2>"
-            f"<p style='font-size: 20px;'>{current_phase['prompt']}</p></div>",
+            AVATAR_PROMPT_TEMPLATE.format(name=s.selected_avatar['name'], prompt=current_phase['prompt']),
             unsafe_allow_html=True
         )
 
         # Play text-to-speech prompt
-        if st.session_state.get('sound_enabled', True):
-            prompt_text = f"{st.session_state.selected_avatar['name']} asks: {current_phase['prompt']}"
-            # Generate a key that is unique to this prompt
-            prompt_key = f"prompt_{scenario_id}_{current_phase['phase_id']}"
-            
+        if s.get('sound_enabled', True):
+            prompt_text = f"{s.selected_avatar['name']} asks: {current_phase['prompt']}"
+
             # Create the audio element for auto-play
-            audio_html = text_to_speech(prompt_text, auto_play=True)
+            audio_html = cached_text_to_speech(prompt_text, auto_play=True)
             st.markdown(f"<div>{audio_html}</div>", unsafe_allow_html=True)
 
         # Display choices with direct click and sound buttons
         choices = current_phase['options']
         
         # Create a separate column for each choice
-        for i, choice in enumerate(choices):
-            # Create a container for the option
-            option_container = st.container()
-            
+        for i, (choice, label) in enumerate(zip(choices, current_phase['_option_labels'])):
             # Create two columns - one for the option card and one for buttons
-            col1, col2 = option_container.columns([4, 1])
+            col1, col2 = st.columns([4, 1])
             
             with col1:
-                # Option button - clicking this selects the option
-                if st.button(f"{choice.get('icon', '🔹')} {choice['text']}", 
-                            key=f"option_{i}", 
-                            use_container_width=True):
-                    handle_option_selection(choice, current_phase, scenario_id, scenario_index, scenarios)
+                # Option button - clicking this selects the option before the next run
+                st.button(label,
+                          key=f"option_{i}",
+                          use_container_width=True,
+                          on_click=handle_option_selection,
+                          args=(choice, current_phase, scenario_id, scenario_index, scenarios))
             
             with col2:
                 # Sound button - clicking this reads the option text aloud
-                prompt_key = f"sound_option_{i}"
-                if st.button("🔊", key=prompt_key, help="Read option aloud"):
-                    # This is just to trigger the audio generation below
-                    st.session_state[f"play_{prompt_key}"] = True
-                
-                # If sound button was clicked, generate and play the audio
-                if st.session_state.get(f"play_{prompt_key}", False):
-                    audio_html = text_to_speech(choice['text'], auto_play=True)
-                    st.markdown(f"<div>{audio_html}</div>", unsafe_allow_html=True)
-                    # Reset for next time
-                    st.session_state[f"play_{prompt_key}"] = False
+                if st.button("🔊", key=f"sound_option_{i}", help="Read option aloud"):
+                    # Single pending slot, played (and cleared) after the loop
+                    s['_pending_audio'] = i
+
+        # Single audio element for the option being read aloud
+        idx = s.pop('_pending_audio', None)
+        if idx is not None and idx < len(choices):
+            audio_html = cached_text_to_speech(choices[idx]['text'], auto_play=True)
+            st.markdown(f"<div>{audio_html}</div>", unsafe_allow_html=True)
             
-        # Add emotion detection feedback
-        if st.session_state.get('camera_enabled', False) and st.session_state.get('webrtc_ctx_active', False):
-            emotion_container = st.container()
-            with emotion_container:
-                try:
-                    # Get current emotion
-                    emotion = get_emotion_feedback()
-                    
-                    # If emotion is distressed, show supportive message
-                    if emotion == "negative":
-                        st.warning("I notice you seem a bit upset. Would you like to take a short break or talk about how you're feeling?")
-                    elif emotion == "happy":
-                        st.success("I can see you're enjoying this! That's wonderful!")
-                except Exception as e:
-                    print(f"Error processing emotion feedback: {e}")
\ No newline at end of file
+        # Add emotion detection feedback in one fixed slot; other emotions leave it empty
+        banner_slot = st.empty()
+        banner = EMOTION_BANNERS.get(current_emotion)
+        if banner:
+            kind, message = banner
+            getattr(banner_slot, kind)(message)
@@ -1,188 +1,211 @@
 import streamlit as st
-from database.scenario_dao import ScenarioDAO
-from pages.tts_helper import text_to_speech, create_tts_button, auto_play_prompt
-import time
+import streamlit.components.v1 as components
+from pages.phase_based_scenario import compute_is_terminal, show_phase_based_scenario
+from pages.tts_helper import cached_text_to_speech
+from collections import namedtuple
+from functools import lru_cache
 
 # Update import to use WebRTC-based emotion detection
 from utils.webrtc_emotion_detection import get_emotion_feedback, is_child_distressed
 
-# Cache for scenarios to avoid repeated database calls
-_scenario_cache = {}
 
+# Countdown and auto-continue, rendered in a component iframe so the script actually runs
+# (st.markdown doesn't execute <script>). One timer waits for the feedback audio to finish,
+# updates the countdown and then presses the page's continue button, found by its label
+# since Streamlit buttons carry no key attribute.
+AUTO_CONTINUE_HTML = """
+<div style="text-align: center; font-family: sans-serif; opacity: 0.7;">
+    <p>Continuing automatically in <span id="countdown">5</span> seconds...</p>
+</div>
+<script>
+(function() {
+    let seconds = 5;
+    let waited = 0;
+    const countdown = document.getElementById('countdown');
+
+    // The feedback line is still loading or playing (blocked autoplay stops waiting after 3 s)
+    function audioBusy() {
+        return Array.from(window.parent.document.querySelectorAll('audio')).some(a =>
+            !a.ended && (!a.paused || (a.currentTime === 0 && waited < 3)));
+    }
+
+    const interval = setInterval(function() {
+        if (audioBusy()) {
+            waited++;
+            return;
+        }
+        seconds--;
+        countdown.textContent = Math.max(seconds, 0);
+        if (seconds > 0) {
+            return;
+        }
+        clearInterval(interval);
+
+        // Continue within the scenario, or pick another scenario after a terminal phase
+        const buttons = Array.from(window.parent.document.querySelectorAll('button'));
+        const target = buttons.find(b => b.innerText.trim() === 'Continue with this scenario') ||
+                       buttons.find(b => b.innerText.trim() === 'Choose another scenario');
+        if (target) {
+            console.log('Auto-continuing');
+            target.click();
+        }
+    }, 1000);
+})();
+</script>
+"""
+
+
+# Static distress notice shown under the feedback when the camera flags distress
+PARENT_ALERT_HTML = """
+<div class="alert">
+    <h3>⚠️ Parent Alert</h3>
+    <p>The system has detected potential emotional distress. A notification would be sent to the parent in a real implementation.</p>
+</div>
+"""
+
+# Session-state keys derived from the current scenario and phase
+FeedbackKeys = namedtuple('FeedbackKeys', 'feedback played')
+
+
+@lru_cache(maxsize=256)
+def _keys(scenario_id, phase):
+    """Build all the session-state keys for one feedback screen in one place"""
+    phase = phase or 'unknown'
+    feedback_key = f"feedback_{scenario_id}_{phase}"
+    return FeedbackKeys(feedback_key, f"played_{feedback_key}")
+
+
+@lru_cache(maxsize=128)
+def _avatar_reaction_html(avatar_emoji, positive):
+    """Avatar emoji with a happy or thinking reaction underneath"""
+    emoji = "😊" if positive else "🤔"
+    return f"<div style='text-align: center;'><span style='font-size: 80px;'>{avatar_emoji}</span><br><span style='font-size: 40px;'>{emoji}</span></div>"
+
+
+@lru_cache(maxsize=128)
+def _avatar_message_html(avatar_name, text):
+    """Speech bubble with the avatar's feedback"""
+    return f"<div class='avatar-message'><h2>{avatar_name} says:</h2><p style='font-size: 20px;'>{text}</p></div>"
+
+
+def _is_terminal(s, current_phase):
+    """Terminal flag stored by the option handler, recomputed if it's missing (e.g. after a restore)"""
+    flag = s.get('is_terminal_phase')
+    if flag is None:
+        flag = compute_is_terminal(current_phase, s.get('scenario_completed', False))
+    return flag
 
-def get_scenario(scenario_id):
-    """Get a scenario with caching to avoid repeated database calls"""
-    if scenario_id in _scenario_cache:
-        return _scenario_cache[scenario_id]
 
-    try:
-        scenario = ScenarioDAO.get_scenario_by_id(scenario_id)
-        if scenario:
-            _scenario_cache[scenario_id] = scenario
-        return scenario
-    except Exception as e:
-        st.error(f"Failed to load scenario details: {e}")
-        return None
-
-
-def get_all_scenarios():
-    """Get all scenarios with caching"""
-    if 'all_scenarios' in _scenario_cache:
-        return _scenario_cache['all_scenarios']
+def continue_to_next_phase():
+    """
+    Process continuing to the next phase in the current scenario.
+    Runs as the continue button's on_click callback, so the run that follows renders the next page.
+    """
+    # Collect the state changes and apply them together.
+    # Temporary feedback and this feedback's played-audio flag are always cleaned up.
+    s = st.session_state
+
+    # Capture our current position
+    current_scenario_id = s.get('current_scenario_id', 0)
+    current_phase = s.get('current_phase')
+
+    # Check if we've reached a terminal phase ("exit" or a phase starting with "end_")
+    if current_phase and _is_terminal(s, current_phase):
+        # Go to scenario selection page after completion and reset the completion state
+        _finish_scenario('scenario_selection')
+        return
 
-    try:
-        scenarios = ScenarioDAO.get_all_scenarios()
-        if scenarios:
-            _scenario_cache['all_scenarios'] = scenarios
-        return scenarios
-    except Exception as e:
-        st.error(f"Failed to load scenarios: {e}")
-        return []
+    # For all other phases, or no current phase, go back to the scenario page to continue
+    s.page = 'scenario'
+    for key in ('temp_feedback', _keys(current_scenario_id, current_phase).played, 'is_terminal_phase'):
+        s.pop(key, None)
 
 
-def continue_to_next_phase():
-    """Process continuing to the next phase in the current scenario"""
-    # Clean up temporary feedback
-    if 'temp_feedback' in st.session_state:
-        del st.session_state.temp_feedback
+def _finish_scenario(page='scenario_selection'):
+    """
+    Leave a terminal feedback page: record the scenario as completed and clear its
+    terminal state so the next scenario's feedback isn't treated as terminal too.
+    Used as an on_click callback.
+    """
+    s = st.session_state
+    current_scenario_id = s.get('current_scenario_id', 0)
+    current_phase = s.get('current_phase')
 
-    # Get scenarios to check if we need to move to the next scenario
-    try:
-        scenarios = get_all_scenarios()
+    # Mark this scenario as completed in our tracking
+    s.setdefault('scenario_completed_indexes', set()).add(s.get('current_scenario_index', 0))
 
-        # Capture our current position
-        current_scenario_index = st.session_state.get('current_scenario_index', 0)
-        current_phase = st.session_state.get('current_phase')
+    s.update({'scenario_completed': False, 'page': page})
+    for key in ('temp_feedback', _keys(current_scenario_id, current_phase).played,
+                'is_terminal_phase', 'current_phase'):
+        s.pop(key, None)
 
-        if current_phase:
-            # Check if we've reached a terminal phase ("exit" or a phase starting with "end_")
-            is_terminal_phase = (current_phase == "exit" or
-                                 current_phase.startswith("end_") or
-                                 st.session_state.get('scenario_completed', False))
-
-            if is_terminal_phase:
-                # Mark this scenario as completed in our tracking
-                if 'scenario_completed_indexes' not in st.session_state:
-                    st.session_state.scenario_completed_indexes = []
-
-                if current_scenario_index not in st.session_state.scenario_completed_indexes:
-                    st.session_state.scenario_completed_indexes.append(current_scenario_index)
-
-                # Go to scenario selection page after completion
-                if 'current_phase' in st.session_state:
-                    del st.session_state.current_phase
-                # Reset scenario completion flag
-                st.session_state.scenario_completed = False
-                st.session_state.page = 'scenario_selection'
-            else:
-                # For all other phases, go back to the scenario page to continue
-                st.session_state.page = 'scenario'
-        else:
-            # No current phase, just go back to the scenario
-            st.session_state.page = 'scenario'
-    except Exception as e:
-        # Default to scenario page if we can't determine next scenario
-        st.session_state.page = 'scenario'
 
-    # Minimal cleanup of played audio flags - only clean the current feedback audio
-    current_scenario_id = st.session_state.get('current_scenario_id', 0)
-    current_phase = st.session_state.get('current_phase', 'unknown')
+def _go_to_page(name):
+    """Switch to another page (used as a button on_click callback, so no st.rerun() is needed)"""
+    st.session_state.page = name
 
-    # Only clean audio flags directly related to this feedback
-    feedback_key = f"feedback_{current_scenario_id}_{current_phase}"
-    played_key = f"played_{feedback_key}"
-    if played_key in st.session_state:
-        del st.session_state[played_key]
 
-    st.rerun()
+def _go_to_scenario_selection():
+    """Leave the current scenario and pick a new one"""
+    # Reset phase for next scenario
+    st.session_state.pop('current_phase', None)
+    _go_to_page('scenario_selection')
 
 
 def handle_continue_button():
     """Handle the continue button click event"""
+    s = st.session_state
+
     # Reset the parent alert flag
-    st.session_state.show_parent_alert = False
+    s.show_parent_alert = False
 
     # Check if we're in a reminder phase that should progress to a specific next phase
-    if st.session_state.get('reminder_phase', False) and 'next_after_reminder' in st.session_state:
-        st.session_state.current_phase = st.session_state.next_after_reminder
-        # Clear the reminder flags
-        st.session_state.reminder_phase = False
-        del st.session_state.next_after_reminder
-        st.session_state.page = 'scenario'
+    if s.get('reminder_phase', False) and 'next_after_reminder' in s:
+        # Move on to the phase after the reminder and clear the reminder flags in one go
+        s.update({
+            'current_phase': s.pop('next_after_reminder'),
+            'reminder_phase': False,
+            'page': 'scenario'
+        })
         st.rerun()
         return
 
     # Check if this is a terminal phase
-    is_terminal_phase = (st.session_state.get('current_phase') == "exit" or
-                         st.session_state.get('current_phase', '').startswith("end_") or
-                         st.session_state.get('scenario_completed', False))
+    is_terminal_phase = _is_terminal(s, s.get('current_phase'))
 
     # After any phase, provide navigation options
     st.markdown("<div style='text-align: center; margin-top: 20px;'>", unsafe_allow_html=True)
 
     if is_terminal_phase:
-        # For terminal phases, offer three options: new scenario, report, or home
+        # For terminal phases, offer three options: new scenario, report, or home.
+        # Each one closes out the finished scenario first (the auto-continue timer presses the first).
         col1, col2, col3 = st.columns(3)
 
         with col1:
-            if st.button("Choose another scenario", key="goto_scenario_selection", use_container_width=True):
-                # Reset phase for next scenario
-                if 'current_phase' in st.session_state:
-                    del st.session_state.current_phase
-                st.session_state.page = 'scenario_selection'
-                st.rerun()
+            st.button("Choose another scenario", key="goto_scenario_selection", use_container_width=True,
+                      on_click=_finish_scenario, args=('scenario_selection',))
 
         with col2:
-            if st.button("View my progress", key="goto_report", use_container_width=True):
-                st.session_state.page = 'report'
-                st.rerun()
+            st.button("View my progress", key="goto_report", use_container_width=True,
+                      on_click=_finish_scenario, args=('report',))
 
         with col3:
-            if st.button("Go to home", key="goto_home", use_container_width=True):
-                st.session_state.page = 'avatar_selection'
-                st.rerun()
+            st.button("Go to home", key="goto_home", use_container_width=True,
+                      on_click=_finish_scenario, args=('avatar_selection',))
     else:
         # For regular phases, offer continue or choose another scenario
         col1, col2 = st.columns(2)
 
         with col1:
-            if st.button("Continue with this scenario", key="continue_next_phase", use_container_width=True):
-                continue_to_next_phase()
+            st.button("Continue with this scenario", key="continue_next_phase", use_container_width=True,
+                      on_click=continue_to_next_phase)
 
         with col2:
-            if st.button("Choose another scenario", key="goto_scenario_selection", use_container_width=True):
-                # Reset phase for next scenario
-                if 'current_phase' in st.session_state:
-                    del st.session_state.current_phase
-                st.session_state.page = 'scenario_selection'
-                st.rerun()
+            st.button("Choose another scenario", key="goto_scenario_selection", use_container_width=True,
+                      on_click=_go_to_scenario_selection)
 
     st.markdown("</div>", unsafe_allow_html=True)
 
-    # JavaScript to automatically continue after a delay
-    st.markdown("""
-    <script>
-    // Auto-continue after delay
-    (function() {
-        // Wait 5 seconds then click the continue button
-        setTimeout(function() {
-            const continueButton = document.querySelector('button[key="continue_next_phase"]');
-            if (continueButton) {
-                console.log('Auto-continuing to next phase');
-                continueButton.click();
-            } else {
-                // For terminal phases, click scenario selection button
-                const scenarioButton = document.querySelector('button[key="goto_scenario_selection"]');
-                if (scenarioButton) {
-                    console.log('Auto-continuing to scenario selection');
-                    scenarioButton.click();
-                }
-            }
-        }, 5000);  // 5 second delay
-    })();
-    </script>
-    """, unsafe_allow_html=True)
-
 
 def show_phase_feedback():
     """Display feedback for phase-based scenarios before proceeding to the next phase"""
@@ -192,41 +215,41 @@ def show_phase_feedback():
     with main_container:
         # Get the temporary feedback saved from the phase handler
         if 'temp_feedback' not in st.session_state:
-            # No feedback available, go back to scenario
+            # No feedback available (e.g. a browser refresh), go back to scenario.
+            # Draw it in this run instead of paying for a second one with st.rerun().
             st.session_state.page = 'scenario'
-            st.rerun()
+            if not st.session_state.get('selected_avatar'):
+                # The app's router sends avatar-less sessions back to avatar selection
+                st.rerun()
+            show_phase_based_scenario(st.session_state.get('current_scenario_index', 0))
             return
 
         feedback = st.session_state.temp_feedback
 
         # Display avatar reaction
         col1, col2 = st.columns([1, 3])
+        avatar = st.session_state.selected_avatar
         with col1:
-            emoji = "😊" if feedback.get("positive", False) else "🤔"
-            st.markdown(
-                f"<div style='text-align: center;'><span style='font-size: 80px;'>{st.session_state.selected_avatar['emoji']}</span><br><span style='font-size: 40px;'>{emoji}</span></div>",
-                unsafe_allow_html=True)
+            st.markdown(_avatar_reaction_html(avatar['emoji'], feedback.get("positive", False)), unsafe_allow_html=True)
 
         with col2:
-            st.markdown(
-                f"<div class='avatar-message'><h2>{st.session_state.selected_avatar['name']} says:</h2><p style='font-size: 20px;'>{feedback['text']}</p></div>",
-                unsafe_allow_html=True)
+            st.markdown(_avatar_message_html(avatar['name'], feedback['text']), unsafe_allow_html=True)
 
         # Auto-play the feedback
         feedback_text = f"{st.session_state.selected_avatar['name']} says: {feedback['text']}"
         # Generate a simpler key for this feedback to avoid key explosion
         current_scenario_id = st.session_state.get('current_scenario_id', 0)
-        current_phase = st.session_state.get('current_phase', 'unknown')
-        feedback_key = f"feedback_{current_scenario_id}_{current_phase}"
+        current_phase = st.session_state.get('current_phase')
+        keys = _keys(current_scenario_id, current_phase)
 
         # Create and directly insert the audio element with autoplay
         if st.session_state.get('sound_enabled', True):
-            audio_html = text_to_speech(feedback_text, auto_play=True)
+            audio_html = cached_text_to_speech(feedback_text, auto_play=True)
             st.markdown(f"<div>{audio_html}</div>", unsafe_allow_html=True)
             # Mark as played
-            st.session_state[f"played_{feedback_key}"] = True
+            st.session_state[keys.played] = True
             # Log for debugging
-            print(f"Playing feedback audio: {feedback_text[:30]}... with key {feedback_key}")
+            print(f"Playing feedback audio: {feedback_text[:30]}... with key {keys.feedback}")
 
         # Check for distress using WebRTC emotion detection
         if st.session_state.get('camera_enabled', False) and st.session_state.get('webrtc_ctx_active', False):
@@ -239,40 +262,10 @@ def show_phase_feedback():
 
         # Parent alert if needed
         if st.session_state.get('show_parent_alert', False):
-            st.markdown("""
-            <div class="alert">
-                <h3>⚠️ Parent Alert</h3>
-                <p>The system has detected potential emotional distress. A notification would be sent to the parent in a real implementation.</p>
-            </div>
-            """, unsafe_allow_html=True)
-
-        # Add a countdown display for auto-continue
-        st.markdown("""
-        <div style="text-align: center; margin-top: 10px; opacity: 0.7;">
-            <p>Continuing automatically in <span id="countdown">5</span> seconds...</p>
-        </div>
-
-        <script>
-        // Countdown timer
-        (function() {
-            let seconds = 5;
-            const countdown = document.getElementById('countdown');
-            if (countdown) {
-                const interval = setInterval(function() {
-                    seconds--;
-                    if (seconds < 0) {
-                        clearInterval(interval);
-                        return;
-                    }
-                    countdown.textContent = seconds;
-                }, 1000);
-            }
-        })();
-        </script>
-        """, unsafe_allow_html=True)
-
-        # Use a simpler, consistent key for the continue button
-        continue_btn_key = f"continue_{current_scenario_id}_{current_phase}"
+            st.markdown(PARENT_ALERT_HTML, unsafe_allow_html=True)
+
+        # Countdown display that continues automatically when it runs out
+        components.html(AUTO_CONTINUE_HTML, height=60)
 
         # Display navigation options through handle_continue_button
         # This handles both terminal phases and regular phases
@@ -2,91 +2,15 @@ import streamlit as st
 import pandas as pd
 from database import db_service as db
 from utils.session_manager import get_session_report, reset_session
-from database.scenario_dao import ScenarioDAO
+from pages.phase_based_scenario import get_all_scenarios
+from utils.report_data import calculate_attention_score, generate_report
 
 
-def calculate_attention_score(attention_df):
-    """Calculate an attention score from 0-10 based on attention metrics"""
-    if len(attention_df) == 0:
-        return 0
-    
-    # Weight different attention states
-    weights = {
-        "Attentive": 10,
-        "Partially Attentive": 6,
-        "Not Attentive": 2,
-        "Unknown": 5
-    }
-    
-    # Calculate weighted average
-    total_weight = 0
-    total_score = 0
-    
-    for state, count in attention_df['attention_state'].value_counts().items():
-        score = weights.get(state, 5)
-        total_score += score * count
-        total_weight += count
-    
-    if total_weight == 0:
-        return 0
-        
-    return total_score / total_weight
-
-
-def generate_report(responses):
-    """Generate a report DataFrame from response data"""
-    if not responses:
-        return pd.DataFrame()
-
-    report_data = []
-
-    # Process the responses
-    for resp in responses:
-        scenario_id = resp.get("scenario_id")
-        response_option = resp.get("response") or resp.get("option_id", "")
-        emotion = resp.get("emotion", "neutral")
-        timestamp = resp.get("timestamp", "")
-        phase_id = resp.get("phase_id", "")
-
-        # Try to get more detailed information if available
-        scenario_title = resp.get("scenario_title", f"Scenario {scenario_id}")
-        phase_desc = resp.get("phase_description", phase_id or "Unknown phase")
-        option_text = resp.get("option_text", f"Option {response_option}")
-        positive = resp.get("positive", True)  # Default to True
-        guidance = resp.get("guidance", False)  # Default to False
-
-        report_data.append({
-            "Scenario": scenario_title,
-            "Phase": phase_desc,
-            "Child's Response": option_text,
-            "Detected Emotion": emotion.capitalize() if emotion else "Unknown",
-            "Positive Choice": "Yes" if positive else "No",
-            "Needed Guidance": "Yes" if guidance else "No",
-            "Timestamp": timestamp
-        })
+def generate_emotion_timeline(emotion_df):
+    """Generate a timeline of emotions from a DataFrame of emotion detections (adds columns in place)"""
+    if emotion_df.empty:
+        return emotion_df
 
-    # Ensure each unique response appears only once
-    # Use a combination of scenario, phase, and response as a unique identifier
-    unique_report_data = []
-    seen_responses = set()
-
-    for entry in report_data:
-        response_key = (entry["Scenario"], entry["Phase"], entry["Child's Response"])
-        if response_key not in seen_responses:
-            seen_responses.add(response_key)
-            unique_report_data.append(entry)
-
-    return pd.DataFrame(unique_report_data)
-
-
-def generate_emotion_timeline(emotion_detections):
-    """Generate a timeline of emotions from emotion detection data"""
-    if not emotion_detections:
-        return pd.DataFrame()
-    
-    # Create DataFrame
-    emotion_df = pd.DataFrame(emotion_detections)
-    
     # Add sequential index to represent time progression
     emotion_df['sequence'] = range(len(emotion_df))
     
@@ -111,21 +35,16 @@ def generate_emotion_timeline(emotion_detections):
     
     if 'emotion' in emotion_df.columns:
         # Add numeric values for charting
-        emotion_df['emotion_value'] = emotion_df['emotion'].map(
-            lambda e: emotion_mapping.get(e.lower() if isinstance(e, str) else 'neutral', 0)
-        )
+        emotion_df['emotion_value'] = emotion_df['emotion'].astype(str).str.lower().map(emotion_mapping).fillna(0)
     
     return emotion_df
 
 
-def generate_attention_analysis(attention_metrics):
-    """Generate analysis from attention metrics data"""
-    if not attention_metrics:
-        return pd.DataFrame(), 0
-    
-    # Create DataFrame
-    attn_df = pd.DataFrame(attention_metrics)
-    
+def generate_attention_analysis(attn_df):
+    """Generate analysis from a DataFrame of attention metrics (adds columns in place)"""
+    if attn_df.empty:
+        return attn_df, 0
+
     # Add sequential index to represent time progression
     attn_df['sequence'] = range(len(attn_df))
     
@@ -181,16 +100,10 @@ def show_report():
         attention_metrics = report_data.get('attention_metrics', [])
 
         # Deduplicate responses based on scenario_id, phase_id, and option_id
-        unique_responses = []
-        seen_responses = set()
-        for resp in responses:
-            response_key = (resp.get('scenario_id'), resp.get('phase_id'), resp.get('option_id'))
-            if response_key not in seen_responses:
-                seen_responses.add(response_key)
-                unique_responses.append(resp)
+        report_df = pd.DataFrame(responses).drop_duplicates(
+            subset=['scenario_id', 'phase_id', 'option_id'], ignore_index=True)
 
-        if unique_responses:
-            report_df = pd.DataFrame(unique_responses)
+        if not report_df.empty:
 
             # Select and rename relevant columns
             columns_to_display = {
@@ -212,14 +125,16 @@ def show_report():
                 display_df = display_df.rename(columns={col: columns_to_display[col] for col in available_columns})
 
                 # Format boolean columns if they exist
+                # (the database stores these as 0/1 or NULL, so cast to bool before mapping)
+                yes_no = {True: 'Yes', False: 'No'}
                 if 'positive' in available_columns:
-                    display_df['Positive Choice'] = display_df['Positive Choice'].map(lambda x: 'Yes' if x else 'No')
+                    display_df['Positive Choice'] = display_df['Positive Choice'].fillna(False).astype(bool).map(yes_no)
                 if 'guidance' in available_columns:
-                    display_df['Needed Guidance'] = display_df['Needed Guidance'].map(lambda x: 'Yes' if x else 'No')
+                    display_df['Needed Guidance'] = display_df['Needed Guidance'].fillna(False).astype(bool).map(yes_no)
                 if 'emotion' in available_columns:
-                    # Just capitalize emotions without remapping
-                    display_df['Detected Emotion'] = display_df['Detected Emotion'].apply(
-                        lambda x: x.capitalize() if x else "Unknown")
+                    # Just capitalize emotions without remapping (missing or empty becomes "Unknown")
+                    display_df['Detected Emotion'] = (display_df['Detected Emotion'].fillna('').astype(str)
+                                                      .str.capitalize().replace('', 'Unknown'))
 
                 # Display responses table
                 st.subheader("Response Summary")
@@ -244,11 +159,11 @@ def show_report():
                 if emotion_detections:
                     st.subheader("Emotion Analysis")
                     
-                    # Process emotion data but keep original labels
-                    emotion_df = generate_emotion_timeline(emotion_detections)
+                    # Process emotion data but keep original labels (one DataFrame for counts and timeline)
+                    emotion_df = generate_emotion_timeline(pd.DataFrame(emotion_detections))
                     
                     # Show emotion distribution with capitalized but unmapped emotions
-                    emotion_counts = pd.Series([e['emotion'].capitalize() for e in emotion_detections]).value_counts().reset_index()
+                    emotion_counts = emotion_df['emotion'].str.capitalize().value_counts().reset_index()
                     emotion_counts.columns = ['Emotion', 'Count']
                     
                     # Display emotion distribution chart
@@ -287,13 +202,13 @@ def show_report():
                     st.subheader("Attention Analysis")
                     
                     # Process attention data
-                    attn_df, attention_score = generate_attention_analysis(attention_metrics)
+                    attn_df, attention_score = generate_attention_analysis(pd.DataFrame(attention_metrics))
                     
                     # Display attention score
                     st.metric("Overall Attention Score", f"{attention_score:.1f}/10")
                     
                     # Show attention state distribution
-                    attn_counts = pd.Series([a['attention_state'] for a in attention_metrics]).value_counts().reset_index()
+                    attn_counts = attn_df['attention_state'].value_counts().reset_index()
                     attn_counts.columns = ['Attention State', 'Count']
                     
                     # Display attention distribution chart
@@ -321,9 +236,7 @@ def show_report():
                         
                         # Convert attention states to numeric values
                         if 'attention_state' in attn_df.columns:
-                            attn_df['attention_value'] = attn_df['attention_state'].map(
-                                lambda x: attention_values.get(x, 3)
-                            )
+                            attn_df['attention_value'] = attn_df['attention_state'].map(attention_values).fillna(3)
                             
                             # Display line chart
                             st.line_chart(attn_df.set_index('sequence')['attention_value'])
@@ -342,9 +255,9 @@ def show_report():
                 show_recommendations(positive_choices, needed_guidance, total_responses, attention_score if attention_metrics else None)
             else:
                 st.warning("Response data is missing expected columns. Using simplified report format.")
-                alt_df = generate_report(unique_responses)
+                alt_df = generate_report(report_df.to_dict('records'))
                 st.dataframe(alt_df, use_column_width=True)
-                show_recommendations(len(unique_responses), 0, len(unique_responses))
+                show_recommendations(len(report_df), 0, len(report_df))
         else:
             st.info("No responses recorded for this session.")
     else:
@@ -374,11 +287,8 @@ def fallback_to_session_state():
         return
 
     # Get all scenarios to map IDs to titles
-    try:
-        scenarios = ScenarioDAO.get_all_scenarios()
-        scenario_map = {scenario['id']: scenario['title'] for scenario in scenarios}
-    except Exception:
-        scenario_map = {}  # Fallback if we can't get scenarios
+    # (cached loader, returns an empty list if we can't get scenarios)
+    scenario_map = {scenario['id']: scenario['title'] for scenario in get_all_scenarios()}
 
     # Format session state responses and deduplicate
     report_data = []
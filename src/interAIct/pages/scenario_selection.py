@@ -1,5 +1,6 @@
 import streamlit as st
-from database.scenario_dao import ScenarioDAO
+# Scenario list shared with the scenario page's Streamlit-cached registry
+from pages.phase_based_scenario import get_all_scenarios
 
 def show_scenario_selection():
     """Display a page for selecting which scenario to play"""
@@ -9,12 +10,8 @@ def show_scenario_selection():
         unsafe_allow_html=True
     )
 
-    # Get all available scenarios
-    try:
-        scenarios = ScenarioDAO.get_all_scenarios()
-    except Exception as e:
-        st.error(f"Failed to load scenarios: {e}")
-        scenarios = []
+    # Get all available scenarios (errors are reported by the loader)
+    scenarios = get_all_scenarios()
 
     # Display scenarios in a grid or list
     if scenarios:
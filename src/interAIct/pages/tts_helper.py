@@ -7,9 +7,11 @@ import hashlib
 import time
 import atexit
 import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # Create a cache for TTS audio to avoid regenerating the same audio multiple times
 _tts_cache = {}
+_tts_cache_lock = threading.Lock()
 _temp_files = []
 _temp_files_lock = threading.Lock()
 
@@ -27,6 +29,98 @@ def _cleanup_temp_files():
 # Register the cleanup function
 atexit.register(_cleanup_temp_files)
 
+# Background workers for prefetching scenario prompt audio, and the prefetches still running
+# (keyed like _tts_cache, guarded by _tts_cache_lock)
+_prefetch_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="tts-prefetch")
+_tts_inflight = {}
+
+
+def _tts_cache_key(text, language, slow):
+    """Cache key from the text, language, and speed"""
+    return hashlib.md5(f"{text}_{language}_{slow}".encode()).hexdigest()
+
+
+def _generate_audio_b64(text, language='en', slow=False):
+    """
+    Return base64 MP3 audio for the text, generating it with gTTS on a cache miss.
+    Safe to call from background threads (no session state access).
+
+    Returns:
+    str: Base64 encoded audio, or None if generation failed
+    """
+    cache_key = _tts_cache_key(text, language, slow)
+
+    # Check if this audio is already in cache, or being generated by a prefetch
+    with _tts_cache_lock:
+        if cache_key in _tts_cache:
+            return _tts_cache[cache_key]
+        future = _tts_inflight.get(cache_key)
+
+    if future is not None:
+        # Wait for the prefetch instead of sending the same text to gTTS twice
+        return future.result()
+
+    return _synthesize_audio_b64(text, language, slow, cache_key)
+
+
+def _synthesize_audio_b64(text, language, slow, cache_key):
+    """Generate the audio with gTTS and store it in the cache; returns None if generation failed"""
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3')
+    temp_file.close()  # Close the file to allow gTTS to write to it
+
+    try:
+        # Generate speech audio file
+        tts = gTTS(text=text, lang=language, slow=slow)
+        tts.save(temp_file.name)
+
+        # Read the audio file
+        with open(temp_file.name, 'rb') as audio_file:
+            audio_bytes = audio_file.read()
+
+        # Add file to cleanup list - but don't delete now
+        with _temp_files_lock:
+            _temp_files.append(temp_file.name)
+
+        # Encode audio to base64
+        audio_b64 = base64.b64encode(audio_bytes).decode()
+
+        with _tts_cache_lock:
+            # Cache the result (limit cache size to 50 items)
+            if len(_tts_cache) >= 50:
+                # Remove oldest item (first key)
+                oldest_key = next(iter(_tts_cache))
+                del _tts_cache[oldest_key]
+
+            _tts_cache[cache_key] = audio_b64
+
+        return audio_b64
+
+    except Exception as e:
+        print(f"Error generating TTS: {e}")
+        return None
+
+
+def _forget_inflight(cache_key):
+    """Drop a finished prefetch (its result is in _tts_cache by then)"""
+    with _tts_cache_lock:
+        _tts_inflight.pop(cache_key, None)
+
+
+def prefetch_tts(texts, language='en', slow=False):
+    """
+    Generate audio for the given texts in the background so later text_to_speech calls hit the cache.
+    A foreground call for a text that is still being prefetched waits for that result.
+    """
+    for text in texts:
+        cache_key = _tts_cache_key(text, language, slow)
+        with _tts_cache_lock:
+            if cache_key in _tts_cache or cache_key in _tts_inflight:
+                continue
+            future = _prefetch_executor.submit(_synthesize_audio_b64, text, language, slow, cache_key)
+            _tts_inflight[cache_key] = future
+        future.add_done_callback(lambda f, key=cache_key: _forget_inflight(key))
+
+
 def text_to_speech(text, language='en', slow=False, auto_play=False):
     """
     Convert text to speech using gTTS and return an HTML audio player.
@@ -46,44 +140,9 @@ def text_to_speech(text, language='en', slow=False, auto_play=False):
     if not st.session_state.get('sound_enabled', True):
         return ""  # Return empty string if sound is disabled
 
-    # Create a cache key from the text, language, and speed
-    cache_key = hashlib.md5(f"{text}_{language}_{slow}".encode()).hexdigest()
-
-    # Check if this audio is already in cache
-    if cache_key in _tts_cache:
-        audio_b64 = _tts_cache[cache_key]
-    else:
-        # Not in cache, need to generate
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3')
-        temp_file.close()  # Close the file to allow gTTS to write to it
-        
-        try:
-            # Generate speech audio file
-            tts = gTTS(text=text, lang=language, slow=slow)
-            tts.save(temp_file.name)
-            
-            # Read the audio file
-            with open(temp_file.name, 'rb') as audio_file:
-                audio_bytes = audio_file.read()
-            
-            # Add file to cleanup list - but don't delete now
-            with _temp_files_lock:
-                _temp_files.append(temp_file.name)
-                
-            # Encode audio to base64
-            audio_b64 = base64.b64encode(audio_bytes).decode()
-            
-            # Cache the result (limit cache size to 50 items)
-            if len(_tts_cache) >= 50:
-                # Remove oldest item (first key)
-                oldest_key = next(iter(_tts_cache))
-                del _tts_cache[oldest_key]
-            
-            _tts_cache[cache_key] = audio_b64
-            
-        except Exception as e:
-            print(f"Error generating TTS: {e}")
-            return ""  # Return empty string on error
+    audio_b64 = _generate_audio_b64(text, language, slow)
+    if audio_b64 is None:
+        return ""  # Return empty string on error
 
     # Create HTML audio player with proper autoplay attribute
     # The autoplay attribute needs to be "autoplay" not "true" or "false"
@@ -99,6 +158,28 @@ def text_to_speech(text, language='en', slow=False, auto_play=False):
 
     return audio_player
 
+@st.cache_data(max_entries=512, show_spinner=False)
+def _cached_tts_html(text, auto_play=True):
+    """Audio player HTML for a static text, generated once per (text, auto_play)"""
+    audio_html = text_to_speech(text, auto_play=auto_play)
+    if not audio_html:
+        # Raise so a failed generation isn't cached
+        raise RuntimeError("TTS generation failed")
+    return audio_html
+
+
+def cached_text_to_speech(text, auto_play=True):
+    """
+    Cached text_to_speech for prompts, options and feedback that repeat across reruns.
+    Still respects the sound_enabled setting in session state.
+    """
+    if not st.session_state.get('sound_enabled', True):
+        return ""
+    try:
+        return _cached_tts_html(text, auto_play)
+    except RuntimeError:
+        return ""
+
 # The rest of your functions can remain the same
 def create_tts_button(text, button_text="🔊", key=None):
     """Creates a button that plays audio when clicked"""
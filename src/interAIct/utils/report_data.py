@@ -0,0 +1,107 @@
+import pandas as pd
+import numpy as np
+
+# Arrow-backed strings are smaller and faster to group/serialize; pyarrow ships with Streamlit.
+# Build one to check pyarrow actually imports (an installed build can still fail against numpy).
+try:
+    pd.array([], dtype="string[pyarrow]")
+    TEXT_DTYPE = "string[pyarrow]"
+except ImportError:
+    TEXT_DTYPE = "string"
+
+# Text columns of db_service.get_session_responses rows
+RESPONSE_TEXT_COLUMNS = (
+    'phase_id', 'option_id', 'emotion', 'timestamp', 'scenario_title',
+    'phase_description', 'option_text', 'feedback_text'
+)
+
+
+def responses_frame(responses):
+    """Build the responses DataFrame with explicit dtypes instead of per-column inference"""
+    n = len(responses)
+    columns = {
+        'id': np.fromiter((r['id'] for r in responses), dtype=np.int64, count=n),
+        'scenario_id': np.fromiter((r['scenario_id'] for r in responses), dtype=np.int32, count=n),
+        # Missing feedback (LEFT JOIN) counts as False
+        'positive': np.fromiter((bool(r.get('positive')) for r in responses), dtype=bool, count=n),
+        'guidance': np.fromiter((bool(r.get('guidance')) for r in responses), dtype=bool, count=n),
+    }
+    for col in RESPONSE_TEXT_COLUMNS:
+        columns[col] = pd.array([r.get(col) for r in responses], dtype=TEXT_DTYPE)
+    return pd.DataFrame(columns, copy=False)
+
+
+def summarize_by_scenario(report_df):
+    """Per-scenario positive/guidance/interaction counts with bincount instead of a groupby round-trip"""
+    codes, titles = pd.factorize(report_df['scenario_title'], sort=False)
+    # Rows without a title are left out, as groupby would drop them
+    valid = codes >= 0
+    codes = codes[valid]
+    n = len(titles)
+    return pd.DataFrame({
+        'Scenario': titles,
+        'Positive Choices': np.bincount(codes, weights=report_df['positive'].to_numpy()[valid], minlength=n).astype(np.int64),
+        'Needed Guidance': np.bincount(codes, weights=report_df['guidance'].to_numpy()[valid], minlength=n).astype(np.int64),
+        'Total Interactions': np.bincount(codes, minlength=n)
+    })
+
+
+def generate_report(responses):
+    """Generate a report DataFrame from response data"""
+    if not responses:
+        return pd.DataFrame()
+
+    report_data = []
+
+    # Process the responses
+    for resp in responses:
+        scenario_id = resp.get("scenario_id")
+        response_option = resp.get("response") or resp.get("option_id", "")
+        emotion = resp.get("emotion", "neutral")
+        timestamp = resp.get("timestamp", "")
+        phase_id = resp.get("phase_id", "")
+
+        # Try to get more detailed information if available
+        scenario_title = resp.get("scenario_title", f"Scenario {scenario_id}")
+        phase_desc = resp.get("phase_description", phase_id or "Unknown phase")
+        option_text = resp.get("option_text", f"Option {response_option}")
+        positive = resp.get("positive", True)  # Default to True
+        guidance = resp.get("guidance", False)  # Default to False
+
+        report_data.append({
+            "Scenario": scenario_title,
+            "Phase": phase_desc,
+            "Child's Response": option_text,
+            "Detected Emotion": emotion.capitalize() if emotion else "Unknown",
+            "Positive Choice": "Yes" if positive else "No",
+            "Needed Guidance": "Yes" if guidance else "No",
+            "Timestamp": timestamp
+        })
+
+    # Ensure each unique response appears only once
+    # Use a combination of scenario, phase, and response as a unique identifier
+    return pd.DataFrame(report_data).drop_duplicates(
+        subset=["Scenario", "Phase", "Child's Response"], ignore_index=True)
+
+
+# Weight of each attention state in the 0-10 attention score (unlisted states count as 5)
+ATTENTION_WEIGHTS = {
+    "Attentive": 10,
+    "Partially Attentive": 6,
+    "Not Attentive": 2,
+    "Unknown": 5
+}
+
+
+def calculate_attention_score(attention_df):
+    """Calculate an attention score from 0-10 based on attention metrics"""
+    if len(attention_df) == 0:
+        return 0
+
+    # Missing states are left out, as value_counts() used to do
+    states = attention_df['attention_state'].dropna()
+    if states.empty:
+        return 0
+
+    # Weighted average is just the mean of each row's weight
+    return float(states.map(ATTENTION_WEIGHTS).fillna(5).mean())
@@ -7,6 +7,15 @@ from database import db_service as db
 _session_cache = {}
 _response_cache = {}
 
+# Default UI state for new or restored sessions (immutable values only)
+SESSION_DEFAULTS = {
+    'selected_avatar': None,
+    'current_scenario_index': 0,
+    'show_parent_alert': False,
+    'camera_enabled': False,
+    'sound_enabled': True
+}
+
 
 def initialize_session_state():
     """Initialize all session state variables with default values"""
@@ -135,16 +144,9 @@ def restore_session_from_database(session_id):
                 pass
 
     # Initialize UI state variables if they don't exist (only set what's needed)
-    if 'selected_avatar' not in st.session_state:
-        st.session_state.selected_avatar = None
-    if 'current_scenario_index' not in st.session_state:
-        st.session_state.current_scenario_index = 0
-    if 'show_parent_alert' not in st.session_state:
-        st.session_state.show_parent_alert = False
-    if 'camera_enabled' not in st.session_state:
-        st.session_state.camera_enabled = False
-    if 'sound_enabled' not in st.session_state:
-        st.session_state.sound_enabled = True
+    missing = {k: v for k, v in SESSION_DEFAULTS.items() if k not in st.session_state}
+    if missing:
+        st.session_state.update(missing)
 
     # Initialize response tracking arrays if they don't exist
     if 'responses' not in st.session_state:
@@ -152,6 +154,10 @@ def restore_session_from_database(session_id):
     if 'phase_responses' not in st.session_state:
         st.session_state.phase_responses = []
 
+    # Cheap "anything recorded yet?" check for the parent dashboard
+    if 'response_count' not in st.session_state:
+        st.session_state.response_count = len(st.session_state.responses)
+
 
 def select_avatar(avatar):
     """Select an avatar and update the database"""
@@ -198,9 +204,11 @@ def record_response(scenario_id, phase_id, option_id, emotion=None):
             )
 
             # Clear the response cache to ensure fresh data next time
+            # (cached reports are keyed on responses_version, so bumping it is enough for those)
             session_id = st.session_state.db_session_id
             if session_id in _response_cache:
                 del _response_cache[session_id]
+            st.session_state.responses_version = st.session_state.get('responses_version', 0) + 1
 
             # Also store in session state for immediate use
             if 'responses' not in st.session_state:
@@ -218,6 +226,7 @@ def record_response(scenario_id, phase_id, option_id, emotion=None):
             }
             st.session_state.responses.append(response_data)
             st.session_state.phase_responses.append(response_data)
+            st.session_state.response_count = st.session_state.get('response_count', 0) + 1
 
     except Exception:
         # Fallback to session state storage
@@ -246,53 +255,28 @@ def record_response(scenario_id, phase_id, option_id, emotion=None):
             }
             st.session_state.responses.append(response_data)
             st.session_state.phase_responses.append(response_data)
+            st.session_state.response_count = st.session_state.get('response_count', 0) + 1
 
 
-def record_detected_emotion(emotion, confidence):
-    """Record a detected emotion in the database"""
-    try:
-        db.record_emotion_detection(
-            st.session_state.db_session_id,
-            emotion,
-            confidence
-        )
-    except Exception:
-        # Fallback to session state storage
-        if 'detected_emotions' not in st.session_state:
-            st.session_state.detected_emotions = []
-
-        st.session_state.detected_emotions.append({
-            "emotion": emotion,
-            "confidence": confidence,
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        })
-
+def session_data_version(session_id):
+    """
+    Version of everything in a session's report: (responses recorded, emotion/attention rows written).
+    Cached report loaders take it as an argument so new data gets a new cache entry.
+    """
+    return st.session_state.get('responses_version', 0), db.get_detection_version(session_id)
 
-def record_attention_metric(attention_state, confidence):
-    """Record attention metrics in the database"""
-    try:
-        db.record_attention_metric(
-            st.session_state.db_session_id,
-            attention_state,
-            confidence
-        )
-    except Exception as e:
-        print(f"Error recording attention metric: {e}")
-        # Fallback to session state storage
-        if 'detected_attention' not in st.session_state:
-            st.session_state.detected_attention = []
 
-        st.session_state.detected_attention.append({
-            "attention_state": attention_state,
-            "confidence": confidence,
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        })
+@st.cache_data(ttl=60, show_spinner=False)
+def load_session_report(session_id, version):
+    """Generate the report for a session, cached across reruns until its data version changes"""
+    return db.generate_report(session_id)
 
 
 def get_session_report():
-    """Get a comprehensive report for the current session"""
+    """Get a comprehensive report for the current session (cached, see load_session_report)"""
     try:
-        report_data = db.generate_report(st.session_state.db_session_id)
+        session_id = st.session_state.db_session_id
+        report_data = load_session_report(session_id, session_data_version(session_id))
         return report_data
     except Exception:
         return None
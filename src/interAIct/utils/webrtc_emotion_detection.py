@@ -4,10 +4,10 @@ import cv2
 import numpy as np
 import threading
 import time
+import queue
 from streamlit_webrtc import webrtc_streamer, WebRtcMode, RTCConfiguration
 from model_preparation import EmotionProcessor
 from database import db_service as db
-from utils.session_manager import record_detected_emotion, record_attention_metric
 
 # Global variables for thread-safe access to detection results
 lock = threading.RLock()
@@ -19,20 +19,42 @@ attention_history = []
 latest_attention = "Unknown"
 MAX_HISTORY = 10
 is_distressed = False
+DISTRESS_EMOTIONS = frozenset({"sadness", "fear", "anger"})
+
+# Face frames are only published for the UI at this rate (monotonic nanoseconds)
+PUBLISH_INTERVAL_NS = 1_000_000_000 // 15
+last_publish_ns = 0
+
+# Database writes are handed off to a single writer thread so the video
+# callback never waits on SQLite
+db_queue = queue.Queue(maxsize=16)
 
 # RTC Configuration with STUN servers for WebRTC
 rtc_configuration = RTCConfiguration(
     {"iceServers": [{"urls": ["stun:stun.l.google.com:19302"]}]}
 )
 
+@st.cache_resource(show_spinner=False)
+def get_emotion_processor():
+    """Create the emotion processor once and share it across reruns, pages and sessions"""
+    return EmotionProcessor()
+
+
 # Initialize the emotion processor once
-emotion_processor = EmotionProcessor()
+emotion_processor = get_emotion_processor()
+
+# Ask the browser for a capture size close to the model input instead of full resolution
+video_constraints = {
+    "width": {"ideal": max(emotion_processor.target_width, 320)},
+    "height": {"ideal": max(emotion_processor.target_height, 240)},
+    "frameRate": {"ideal": 15, "max": 30},
+}
 
 
 def video_frame_callback(frame):
     """Process video frames from WebRTC stream and detect emotions"""
     global latest_emotion, latest_confidence, latest_face_frame, emotion_history, is_distressed
-    global attention_history, latest_attention
+    global attention_history, latest_attention, last_publish_ns
     
     # Get the image from the frame
     img = frame.to_ndarray(format="bgr24")
@@ -55,17 +77,16 @@ def video_frame_callback(frame):
             # Draw face rectangle
             cv2.rectangle(img, (x, y), (x+w, y+h), (0, 255, 0), 2)
             
-            # Store face frame for UI display
-            with lock:
-                latest_face_frame = face_roi.copy()
-            
-            # Run emotion detection
-            result = emotion_processor.run_emotion_detection(face_roi)
+            # Store face frame for UI display, throttled to what the UI can consume
+            now_ns = time.monotonic_ns()
+            if now_ns - last_publish_ns >= PUBLISH_INTERVAL_NS:
+                with lock:
+                    latest_face_frame = face_roi.copy()
+                    last_publish_ns = now_ns
             
-            # Extract results
-            emotions = result["emotions"]
-            dominant_emotion = result["dominant_emotion"].lower()
-            confidence = result.get("confidence", max(emotions.values()))
+            # Run emotion detection - only the dominant label and confidence are needed here
+            probs, _ = emotion_processor.infer(face_roi)
+            dominant_emotion, confidence = emotion_processor.dominant(probs)
             
             # Update state with lock
             with lock:
@@ -79,7 +100,7 @@ def video_frame_callback(frame):
                 emotion_history.append({
                     "emotion": dominant_emotion,
                     "confidence": confidence,
-                    "timestamp": time.time()
+                    "timestamp_ns": now_ns
                 })
                 
                 # Limit history size
@@ -88,7 +109,7 @@ def video_frame_callback(frame):
                 
                 # Check for distress emotions, but preserve the original emotion labels
                 distress_count = sum(1 for entry in emotion_history 
-                                   if entry["emotion"] in ["sadness", "fear", "anger"] 
+                                   if entry["emotion"] in DISTRESS_EMOTIONS 
                                    and entry["confidence"] > 0.7)
                 is_distressed = distress_count >= 3
             
@@ -104,16 +125,13 @@ def video_frame_callback(frame):
             # Store in database if session ID is available
             session_id = st.session_state.get('db_session_id')
             if session_id:
-                try:
-                    # Record emotion if it changed or it's the first detection
-                    if emotion_changed or len(emotion_history) == 1:
-                        record_detected_emotion(dominant_emotion, confidence)
-                    
-                    # Record attention state (we'll record on changes or periodically)
-                    if len(attention_history) == 1 or (len(attention_history) > 1 and attention_history[-1] != attention_history[-2]):
-                        record_attention_metric(latest_attention, confidence)
-                except Exception as e:
-                    print(f"Error recording emotion/attention: {e}")
+                # Record emotion if it changed or it's the first detection
+                if emotion_changed or len(emotion_history) == 1:
+                    enqueue_db_write(db.record_emotion_detection, session_id, dominant_emotion, confidence)
+                
+                # Record attention state (we'll record on changes or periodically)
+                if len(attention_history) == 1 or (len(attention_history) > 1 and attention_history[-1] != attention_history[-2]):
+                    enqueue_db_write(db.record_attention_metric, session_id, latest_attention, confidence)
             
             # Draw emotion text on image
             cv2.putText(img, f"{dominant_emotion.capitalize()} ({confidence:.2f})", 
@@ -126,6 +144,35 @@ def video_frame_callback(frame):
     return av.VideoFrame.from_ndarray(img, format="bgr24")
 
 
+def enqueue_db_write(func, *args):
+    """Queue a database write for the writer thread, dropping the oldest entry when full"""
+    try:
+        db_queue.put_nowait((func, args))
+    except queue.Full:
+        try:
+            db_queue.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            db_queue.put_nowait((func, args))
+        except queue.Full:
+            pass
+
+
+def _db_writer():
+    """Drain queued database writes off the video processing thread"""
+    while True:
+        func, args = db_queue.get()
+        try:
+            func(*args)
+        except Exception as e:
+            print(f"Error recording emotion/attention: {e}")
+
+
+db_writer_thread = threading.Thread(target=_db_writer, daemon=True)
+db_writer_thread.start()
+
+
 def get_emotion_feedback():
     """
     Get the detected emotion directly without mapping to broader categories.
@@ -156,9 +203,8 @@ def get_attention_state():
 
 def is_child_distressed():
     """Check if the child appears distressed based on recent emotions"""
-    global is_distressed
-    with lock:
-        return is_distressed
+    # A single rebound bool is read atomically, so the UI never waits on the video thread
+    return is_distressed
 
 
 def setup_emotion_detection():
@@ -168,7 +214,7 @@ def setup_emotion_detection():
         mode=WebRtcMode.SENDRECV,
         rtc_configuration=rtc_configuration,
         video_frame_callback=video_frame_callback,
-        media_stream_constraints={"video": True, "audio": False},
+        media_stream_constraints={"video": video_constraints, "audio": False},
         async_processing=True,
     )
     
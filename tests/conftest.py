@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The app imports its packages (database, pages, utils) from src/interAIct
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "interAIct"))
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+
+from model_preparation import EmotionProcessor
+
+
+def test_infer_returns_normalised_probabilities():
+    processor = EmotionProcessor()
+    probs, execution_time = processor.infer(np.zeros((48, 48, 3), dtype=np.uint8))
+
+    assert probs.shape == (len(processor.emotion_labels),)
+    assert probs.sum() == pytest.approx(1.0, abs=1e-5)
+    assert (probs >= 0).all()
+    assert execution_time >= 0
+
+
+def test_dominant_and_build_result():
+    processor = EmotionProcessor()
+    probs = np.array([0.1, 0.05, 0.05, 0.6, 0.1, 0.1], dtype=np.float32)
+
+    label, confidence = processor.dominant(probs)
+    assert label == "joy"
+    assert confidence == pytest.approx(0.6)
+
+    result = processor.build_result(probs, 12.5)
+    assert result["dominant_emotion"] == "joy"
+    assert result["confidence"] == pytest.approx(0.6)
+    assert result["execution_time_ms"] == 12.5
+    assert list(result["emotions"]) == processor.emotion_labels
+    assert result["emotions"]["joy"] == pytest.approx(0.6)
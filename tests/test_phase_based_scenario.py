@@ -0,0 +1,20 @@
+import pytest
+
+# The pages package imports every page, including the WebRTC and TTS ones
+pytest.importorskip("streamlit_webrtc")
+pytest.importorskip("gtts")
+
+from pages.phase_based_scenario import compute_is_terminal
+
+
+@pytest.mark.parametrize("phase, completed, expected", [
+    ("exit", False, True),
+    ("end_good", False, True),
+    ("start", False, False),
+    ("start", True, True),
+    (None, False, False),
+    (None, 1, True),
+])
+def test_compute_is_terminal(phase, completed, expected):
+    assert compute_is_terminal(phase, completed) is expected
+
@@ -0,0 +1,15 @@
+import pytest
+
+# The pages package imports every page, including the WebRTC and TTS ones
+pytest.importorskip("streamlit_webrtc")
+pytest.importorskip("gtts")
+
+from pages.phase_feedback import _keys
+
+
+def test_keys():
+    keys = _keys(3, "start")
+    assert keys.feedback == "feedback_3_start"
+    assert keys.played == "played_feedback_3_start"
+    assert _keys(3, None).feedback == "feedback_3_unknown"
+    assert _keys(3, None).played == "played_feedback_3_unknown"
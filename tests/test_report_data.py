@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+
+from utils.report_data import calculate_attention_score, generate_report, responses_frame, summarize_by_scenario
+
+
+def _response(id, scenario_id, title, positive, guidance, option_id="A"):
+    return {
+        "id": id, "scenario_id": scenario_id, "phase_id": "start", "option_id": option_id,
+        "emotion": "joy", "timestamp": "2024-01-01 10:00:00", "scenario_title": title,
+        "phase_description": "Start", "option_text": f"Option {option_id}", "feedback_text": None,
+        "positive": positive, "guidance": guidance,
+    }
+
+
+def test_responses_frame_treats_missing_feedback_as_no():
+    # positive/guidance are NULL when a response has no feedback row (LEFT JOIN)
+    responses = [
+        _response(1, 1, "Playground", 1, 0),
+        _response(2, 1, "Playground", None, None, option_id="B"),
+    ]
+    df = responses_frame(responses)
+
+    assert df["positive"].dtype == bool
+    assert list(df["positive"]) == [True, False]
+    assert list(df["guidance"]) == [False, False]
+    assert df["feedback_text"].isna().all()
+
+
+def test_summarize_by_scenario_counts_per_title():
+    responses = [
+        _response(1, 1, "Playground", 1, 0),
+        _response(2, 1, "Playground", 0, 1, option_id="B"),
+        _response(3, 2, "Classroom", 1, 1),
+        _response(4, 3, None, 1, 0),
+    ]
+    summary = summarize_by_scenario(responses_frame(responses))
+
+    assert list(summary["Scenario"]) == ["Playground", "Classroom"]
+    assert list(summary["Positive Choices"]) == [1, 1]
+    assert list(summary["Needed Guidance"]) == [1, 1]
+    assert list(summary["Total Interactions"]) == [2, 1]
+
+def test_generate_report_drops_duplicate_responses():
+    responses = [
+        _response(1, 1, "Playground", 1, 0),
+        _response(2, 1, "Playground", 1, 0),
+        _response(3, 1, "Playground", 0, 1, option_id="B"),
+    ]
+    report = generate_report(responses)
+
+    assert list(report.index) == [0, 1]
+    assert list(report["Child's Response"]) == ["Option A", "Option B"]
+    assert list(report["Positive Choice"]) == ["Yes", "No"]
+    assert list(report["Needed Guidance"]) == ["No", "Yes"]
+
+def test_calculate_attention_score_weights():
+    df = pd.DataFrame({"attention_state": ["Attentive", "Partially Attentive", "Not Attentive"]})
+    assert calculate_attention_score(df) == pytest.approx((10 + 6 + 2) / 3)
+
+
+def test_calculate_attention_score_skips_missing_states():
+    df = pd.DataFrame({"attention_state": ["Attentive", None, "Daydreaming"]})
+    # None is left out, unknown states count as 5
+    assert calculate_attention_score(df) == pytest.approx((10 + 5) / 2)
+
+
+def test_calculate_attention_score_empty():
+    assert calculate_attention_score(pd.DataFrame({"attention_state": []})) == 0
+    assert calculate_attention_score(pd.DataFrame({"attention_state": [None]})) == 0
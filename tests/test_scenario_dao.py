@@ -0,0 +1,62 @@
+import pytest
+
+from database import db_schema
+from database.scenario_dao import ScenarioDAO
+
+
+@pytest.fixture
+def scenario_db(tmp_path, monkeypatch):
+    """Empty schema in a throwaway database, with the DAO's thread connection reset"""
+    monkeypatch.setattr(db_schema, "DB_PATH", str(tmp_path / "test.db"))
+    ScenarioDAO._close_thread_connection()
+    db_schema.initialize_database()
+    conn = db_schema.get_db_connection()
+    yield conn
+    conn.close()
+    ScenarioDAO._close_thread_connection()
+
+
+def test_get_all_scenarios_full_groups_left_join(scenario_db):
+    cur = scenario_db.cursor()
+    cur.executemany("INSERT INTO scenarios (id, title, description, image_path) VALUES (?, ?, ?, ?)", [
+        (1, "Playground", "Swings", "a.png"),
+        (2, "Empty", "No phases yet", "b.png"),
+    ])
+    cur.executemany("INSERT INTO phases (id, scenario_id, phase_id, description, prompt) VALUES (?, ?, ?, ?, ?)", [
+        (10, 1, "start", "Start", "What do you do?"),
+        (11, 1, "end_good", "End", "Well done"),
+    ])
+    cur.executemany("INSERT INTO options (phase_id, option_id, text, icon, emotion, next_phase) VALUES (?, ?, ?, ?, ?, ?)", [
+        (10, "A", "Ask nicely", "🙂", "joy", "end_good"),
+        (10, "B", "Push", "😠", "anger", "start"),
+    ])
+    # Only option A has feedback
+    cur.execute("INSERT INTO feedback (phase_id, option_id, text, positive, guidance) VALUES (10, 'A', 'Great!', 1, 0)")
+    scenario_db.commit()
+
+    scenarios = ScenarioDAO.get_all_scenarios_full()
+
+    assert [s["id"] for s in scenarios] == [1, 2]
+    playground, empty = scenarios
+    assert empty["title"] == "Empty"
+    assert empty["phases"] == []
+
+    start, end = playground["phases"]
+    assert start["phase_id"] == "start"
+    assert [o["option_id"] for o in start["options"]] == ["A", "B"]
+    assert start["options"][0]["next_phase"] == "end_good"
+    assert start["feedback"] == {"A": {"text": "Great!", "positive": True, "guidance": False}}
+    assert end["phase_id"] == "end_good"
+    assert end["options"] == []
+    assert end["feedback"] == {}
+
+
+def test_get_all_scenarios_full_reads_current_data(scenario_db):
+    # Caching is left to the dashboard's Streamlit TTL wrapper
+    scenario_db.execute("INSERT INTO scenarios (id, title, description, image_path) VALUES (1, 'One', 'd', 'a.png')")
+    scenario_db.commit()
+    assert [s["id"] for s in ScenarioDAO.get_all_scenarios_full()] == [1]
+
+    scenario_db.execute("INSERT INTO scenarios (id, title, description, image_path) VALUES (2, 'Two', 'd', 'b.png')")
+    scenario_db.commit()
+    assert [s["id"] for s in ScenarioDAO.get_all_scenarios_full()] == [1, 2]